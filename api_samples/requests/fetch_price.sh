@@ -1,4 +1,23 @@
 curl --request GET \
   --url 'http://localhost:8888/api/price?market=BANKNIFTY&from_date=2024-09-17&to_date=2024-09-17&from_time=13%3A21%3A00&to_time=13%3A25%3A00' \
   --header 'User-Agent: insomnia/10.0.0' \
-  --cookie 'csrftoken=5tZgth9NmymSemHYezSmGWBkKA27zCYaSSdDqumIqfpwieAnlveb0MiBl1NLqsim; JSESSIONID=B5E9B6556781966DD0BFEE43D0EEF554'
\ No newline at end of file
+  --cookie 'csrftoken=5tZgth9NmymSemHYezSmGWBkKA27zCYaSSdDqumIqfpwieAnlveb0MiBl1NLqsim; JSESSIONID=B5E9B6556781966DD0BFEE43D0EEF554'
+
+# column-oriented JSON (one array per field, epoch ms times) and packed float64 arrays
+# (see price_app/price_formats.py), both streamed
+curl --request GET \
+  --url 'http://localhost:8888/api/price?market=BANKNIFTY&from_date=2024-09-17&to_date=2024-09-17&from_time=13%3A21%3A00&to_time=13%3A25%3A00&format=columns'
+curl --request GET \
+  --url 'http://localhost:8888/api/price?market=BANKNIFTY&from_date=2024-09-17&to_date=2024-09-17&from_time=13%3A21%3A00&to_time=13%3A25%3A00' \
+  --header 'Accept: application/octet-stream' --output price.bin
+
+# indicator settings overriding price_app/configs.py for this chart (any of
+# price_app/live_indicators.py indicator_setting_names)
+curl --request GET \
+  --url 'http://localhost:8888/api/price?market=BANKNIFTY&from_date=2024-09-17&to_date=2024-09-17&from_time=13%3A21%3A00&to_time=13%3A25%3A00&format=columns&smooth_price_period=30&smooth_slope_averaging_method=exponential'
+
+# several markets / chart configs in one call, loaded concurrently (price_app/handlers.py fetch_price_batch)
+curl --request POST \
+  --url 'http://localhost:8888/api/price/batch' \
+  --header 'Content-Type: application/json' \
+  --data '{"from_date": "2024-09-17", "to_date": "2024-09-17", "from_time": "09:15:00", "to_time": "15:30:00", "max_points": 2000, "charts": [{"market": "NIFTY"}, {"market": "BANKNIFTY"}, {"market": "NIFTY", "chart_config": {"smooth_price_period": 30}}]}'
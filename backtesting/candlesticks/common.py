@@ -1,8 +1,8 @@
 from typing import List
 from datetime import datetime, date, time
+from common.utils import from_epoch_ms
 from backtesting.candlesticks.entities import Tick, Candlestick
-from price_app.handlers import fetch_price_from_database
-from price_app.models import NiftyPrice
+from price_app.handlers import fetch_price_from_database, fetch_candles_from_database
 from stock_data_fetch.enums import MarketType
 
 
@@ -44,18 +44,38 @@ def fetch_nifty_ticks(
 ) -> List[Tick]:
     ticks: List[Tick] = []
 
-    nifty_prices: List[NiftyPrice] = fetch_price_from_database(
+    timestamps, prices = fetch_price_from_database(
         MarketType.NIFTY,
         start_timestamp,
         to_timestamp,
     )
 
-    for nifty_price in nifty_prices:
-        ticks.append(Tick(nifty_price.timestamp, nifty_price.tick_price))
+    for epoch_ms, price in zip(timestamps.tolist(), prices.tolist()):
+        ticks.append(Tick(from_epoch_ms(epoch_ms), price))
 
     return ticks
 
 
+# candles aligned to multiples of 'length_in_sec', read from the rollups kept by the price
+# fetch process instead of being rebuilt from ticks
+def fetch_nifty_candlesticks(
+    start_timestamp: datetime,
+    to_timestamp: datetime,
+    length_in_sec: int,
+) -> List[Candlestick]:
+    candlesticks: List[Candlestick] = []
+
+    candles = fetch_candles_from_database(MarketType.NIFTY, length_in_sec, start_timestamp, to_timestamp)
+    for candle in candles:
+        start_time = Tick(candle.start_timestamp, candle.open).timestamp  # in IST
+        candlesticks.append(Candlestick(
+            length_in_sec, start_time.date(), start_time.time(),
+            candle.open, candle.high, candle.low, candle.close,
+        ))
+
+    return candlesticks
+
+
 def get_time_diff(prev_time: time, cur_time: time) -> int:
     date_today = date.today()
     datetime1 = datetime.combine(date_today, prev_time)
@@ -1,7 +1,9 @@
 import json
+import sys
 from typing import List
 from datetime import date, time, datetime
 from abc import ABC, abstractmethod
+from django.db import transaction
 from backtesting.enums import Market
 from backtesting.models import Trade, Backtesting, DailyBacktesting
 from price_app.scripts.momentum_analysis.momentum_analysis import time_str_format
@@ -239,11 +241,87 @@ class BacktestingInput:
         )
 
 
+# Plain records of the trades and daily results made by the backtests, with the fields of the
+# Trade / DailyBacktesting models. Optimisations run the backtests over and over for their
+# cost only: the django models are made from the records when the results are saved
+class TradeRecord:
+    __slots__ = (
+        'date', 'expected_direction',
+        'entry_time', 'entry_point', 'entry_conditions',
+        'exit_time', 'exit_point', 'exit_conditions',
+        'gain',
+    )
+
+    def __init__(
+            self,
+            date: date,
+            expected_direction: str,
+            entry_time: time,
+            entry_point: float,
+            entry_conditions: str,
+            exit_time: time = None,
+            exit_point: float = None,
+            exit_conditions: str = '',
+            gain: float = 0,
+    ):
+        self.date = date
+        self.expected_direction = expected_direction
+        self.entry_time = entry_time
+        self.entry_point = entry_point
+        self.entry_conditions = entry_conditions
+        self.exit_time = exit_time
+        self.exit_point = exit_point
+        self.exit_conditions = exit_conditions
+        self.gain = gain
+
+    def to_model(self, daily_backtesting: DailyBacktesting) -> Trade:
+        return Trade(
+            daily_backtesting=daily_backtesting,
+            **{field: getattr(self, field) for field in self.__slots__},
+        )
+
+
+class DailyBacktestingRecord:
+    __slots__ = (
+        'backtesting', 'date', 'start_time', 'end_time', 'expected_direction',
+        'trade_count', 'winning_trade_count', 'loosing_trade_count', 'success_rate',
+    )
+
+    def __init__(
+            self,
+            backtesting: Backtesting,
+            date: date,
+            start_time: time,
+            end_time: time,
+            expected_direction: str,
+            trade_count: int = 0,
+            winning_trade_count: int = 0,
+            loosing_trade_count: int = 0,
+            success_rate: float = None,
+    ):
+        self.backtesting = backtesting
+        self.date = date
+        self.start_time = start_time
+        self.end_time = end_time
+        self.expected_direction = expected_direction
+        self.trade_count = trade_count
+        self.winning_trade_count = winning_trade_count
+        self.loosing_trade_count = loosing_trade_count
+        self.success_rate = success_rate
+
+    def calculate_success_rate(self):
+        if self.trade_count > 0:
+            self.success_rate = round((self.winning_trade_count / self.trade_count) * 100, 2)
+
+    def to_model(self) -> DailyBacktesting:
+        return DailyBacktesting(**{field: getattr(self, field) for field in self.__slots__})
+
+
 class DailyBacktestingResult:
     def __init__(
             self,
-            daily_back_testing: DailyBacktesting,
-            trades: List[Trade],
+            daily_back_testing: DailyBacktestingRecord,
+            trades: List[TradeRecord],
     ):
         self.daily_back_testing = daily_back_testing
         self.trades = trades
@@ -252,9 +330,13 @@ class DailyBacktestingResult:
         self.daily_back_testing.calculate_success_rate()
 
     def save_to_db(self):
-        self.daily_back_testing.save()
-        for trade in self.trades:
-            trade.save()
+        with transaction.atomic():
+            daily_backtesting = self.daily_back_testing.to_model()
+            daily_backtesting.save()
+            Trade.objects.bulk_create(
+                [trade.to_model(daily_backtesting) for trade in self.trades],
+                batch_size=default_save_batch_size,
+            )
 
 
 class BacktestingResult:
@@ -266,10 +348,84 @@ class BacktestingResult:
         self.back_testing = back_testing
         self.daily_back_testing_results = daily_back_testing_results
 
-    def save_to_db(self):
-        self.back_testing.save()
-        for daily_back_testing_result in self.daily_back_testing_results:
-            daily_back_testing_result.save_to_db()
+    def save_to_db(self, batch_size: int = None):
+        with BacktestingResultWriter(self.back_testing, batch_size) as writer:
+            for daily_back_testing_result in self.daily_back_testing_results:
+                writer.add(daily_back_testing_result)
+
+
+default_save_batch_size = 1000  # rows per INSERT, and trades buffered by BacktestingResultWriter
+
+
+# Saves a backtest in one transaction with a handful of queries: the backtesting row, then
+# per batch of (about) 'batch_size' trades one INSERT of the daily rows, one SELECT of their
+# ids and the INSERTs of the trades. Daily results can be added as the backtest makes them,
+# so that long runs don't keep every trade in memory:
+#   with BacktestingResultWriter(back_testing) as writer:
+#       for day ...:
+#           writer.add(daily_backtesting_result)
+# The backtesting row is saved again on exit, with the counts it has by then
+class BacktestingResultWriter:
+    def __init__(self, back_testing: Backtesting, batch_size: int = None):
+        self.back_testing = back_testing
+        self.batch_size = batch_size or default_save_batch_size
+        self.pending: List[DailyBacktestingResult] = []
+        self.pending_trade_count = 0
+        self.atomic = transaction.atomic()
+
+    def __enter__(self):
+        self.atomic.__enter__()
+        try:
+            self.back_testing.save()
+        except BaseException:
+            self.atomic.__exit__(*sys.exc_info())
+            raise
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.flush()
+                self.back_testing.save()
+        except BaseException:
+            self.atomic.__exit__(*sys.exc_info())
+            raise
+
+        return self.atomic.__exit__(exc_type, exc_val, exc_tb)
+
+    def add(self, daily_back_testing_result: DailyBacktestingResult):
+        self.pending.append(daily_back_testing_result)
+        self.pending_trade_count += len(daily_back_testing_result.trades)
+        if self.pending_trade_count >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.pending) == 0:
+            return
+
+        daily_backtestings = [result.daily_back_testing.to_model() for result in self.pending]
+        DailyBacktesting.objects.bulk_create(daily_backtestings, batch_size=self.batch_size)
+
+        # mysql doesn't return the ids of bulk inserted rows. Within the transaction, the
+        # rows just inserted are the last ones of this backtesting, in the order of insertion
+        if any(daily_backtesting.pk is None for daily_backtesting in daily_backtestings):
+            ids = DailyBacktesting.objects.filter(backtesting=self.back_testing) \
+                .order_by('-id').values_list('id', flat=True)[:len(daily_backtestings)]
+            for daily_backtesting, daily_backtesting_id in zip(daily_backtestings, reversed(list(ids))):
+                daily_backtesting.pk = daily_backtesting_id
+
+        Trade.objects.bulk_create(
+            [
+                trade.to_model(daily_backtesting)
+                for result, daily_backtesting in zip(self.pending, daily_backtestings)
+                for trade in result.trades
+            ],
+            batch_size=self.batch_size,
+        )
+
+        self.pending = []
+        self.pending_trade_count = 0
 
 
 class LinearRegressionLine:
@@ -0,0 +1,48 @@
+from datetime import time
+import numpy as np
+from backtesting.entities import TradeConfig
+from backtesting.utils import get_linear_regression_arrays
+from price_app.price_frame import PriceFrame, ist_ms_of_day
+
+# The entry conditions of the move catchers checked for a whole day at once, so that the
+# backtest loops only visit the indices that may make an entry. The trendline thresholds are
+# compared on the vectorised regressions of get_linear_regression_arrays, which may differ from
+# the ones of calculate_trend_line in the last bits: they are loosened by a relative
+# 'trend_line_tolerance', giving a superset of the entries, each confirmed by should_make_entry
+trend_line_tolerance = 1e-6
+
+
+def time_in_us(tm: time) -> int:
+    return ((tm.hour * 60 + tm.minute) * 60 + tm.second) * 1000000 + tm.microsecond
+
+
+def loosened(threshold: float, direction: int) -> float:
+    return threshold + direction * trend_line_tolerance * (1 + abs(threshold))
+
+
+# sorted indices where should_make_entry may be true. 'direction' is 1 for up moves (values
+# >= thresholds), -1 for down moves (values <= -thresholds). The trendline of index i is the
+# regression of the tick prices [i - datapoint_cnt, i] every 'gap' ticks
+def entry_candidate_indices(
+        price_list: PriceFrame,
+        trade_config: TradeConfig,
+        direction: int,
+        datapoint_cnt: int,
+        gap: int,
+) -> np.ndarray:
+    trend_line_m, _, trend_line_variance = get_linear_regression_arrays(
+        price_list.column('tick_price'), datapoint_cnt, gap)
+    trend_line_m = direction * trend_line_m
+    slope = direction * price_list.column('slope')
+    momentum = direction * price_list.column('momentum')
+
+    mask = np.zeros(len(price_list), dtype=bool)
+    for entry_condition in trade_config.entry_conditions:
+        mask |= (trend_line_variance <= loosened(entry_condition.max_variance, 1)) & \
+                (trend_line_m >= loosened(entry_condition.min_abs_trend_slope, -1)) & \
+                (slope >= entry_condition.min_abs_price_slope) & \
+                (momentum >= entry_condition.min_abs_price_momentum)
+
+    mask &= ist_ms_of_day(price_list.epoch_ms) * 1000 > time_in_us(trade_config.min_entry_time)
+
+    return np.flatnonzero(mask)
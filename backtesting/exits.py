@@ -0,0 +1,65 @@
+from typing import NamedTuple, Optional, Tuple
+import numpy as np
+from backtesting.entities import TradeConfig
+
+# Exits of fixed stoploss / profit target trades found with array scans instead of stepping
+# should_exit forward tick by tick (or candle by candle): the exit is the first index where
+# the price crosses the stoploss or the target barrier, the stoploss winning when both are
+# crossed at the same index, as should_exit checks it first
+
+# the first chunk scanned, doubled up to the end of the day: trades mostly exit soon after
+# the entry, the scan shouldn't go through the whole day for them
+first_chunk_size = 256
+
+
+class Barrier(NamedTuple):
+    values: np.ndarray  # e.g. the tick prices, or the lows / highs of candles
+    level: float
+    below: bool  # crossed by values <= level, else by values >= level
+
+
+class ExitHit(NamedTuple):
+    index: int
+    stoploss_hit: bool
+    target_hit: bool
+
+
+def check_fixed_exit_condition(trade_config: TradeConfig):
+    if trade_config.exit_condition.stoploss_type != 'fixed':
+        raise Exception(f'exit condition type {trade_config.exit_condition.stoploss_type} '
+                        f'is not valid for making an exit')
+    if trade_config.exit_condition.profit_target_type != 'fixed':
+        raise Exception(f'exit condition type {trade_config.exit_condition.profit_target_type} '
+                        f'is not valid for making an exit')
+
+
+# index of the first True of 'crossed', None if there is none
+def first_true(crossed: np.ndarray) -> Optional[int]:
+    k = int(np.argmax(crossed))
+    return k if crossed[k] else None
+
+
+# exit of a trade entered before 'start': the first index from 'start' crossing a barrier,
+# else the last index, with neither hit. Both barriers are scanned over the same chunks,
+# up to the first chunk crossing either
+def first_exit(stoploss: Barrier, target: Barrier, start: int) -> ExitHit:
+    n = len(stoploss.values)
+    chunk_size = first_chunk_size
+    while start < n:
+        chunk_end = min(start + chunk_size, n)
+        stoploss_values = stoploss.values[start:chunk_end]
+        target_values = target.values[start:chunk_end]
+        stoploss_index = first_true(
+            stoploss_values <= stoploss.level if stoploss.below else stoploss_values >= stoploss.level)
+        target_index = first_true(
+            target_values <= target.level if target.below else target_values >= target.level)
+
+        if stoploss_index is not None and (target_index is None or stoploss_index <= target_index):
+            return ExitHit(start + stoploss_index, True, False)
+        if target_index is not None:
+            return ExitHit(start + target_index, False, True)
+
+        start = chunk_end
+        chunk_size *= 2
+
+    return ExitHit(n - 1, False, False)
@@ -1,22 +1,24 @@
 from datetime import date, time, timedelta
 from typing import List
+import numpy as np
 from backtesting.constants import market_entry_time, market_exit_time
-from backtesting.entities import BacktestingInput, BacktestingResult, DailyBacktestingResult, ChartConfig, TradeConfig
+from backtesting.entities import BacktestingInput, BacktestingResult, DailyBacktestingResult, ChartConfig, TradeConfig, \
+    DailyBacktestingRecord, TradeRecord
 from backtesting.enums import BacktestingStrategy, Market, Direction
-from backtesting.models import Backtesting, DailyBacktesting, Trade
+from backtesting.models import Backtesting
 from backtesting.momentum_1min_candle.move_catcher import new_move_catcher, IMoveCatcher
 from backtesting.momentum_1min_candle.upstox import fetch_candlestick_data_from_upstox, UpstoxCandlestickResponse
-from price_app.classes import PriceData, PriceDataPerTick, calculate_other_auxiliary_prices, PriceDataPerCandle
+from price_app.classes import PriceData, calculate_other_auxiliary_prices
+from price_app.price_frame import PriceFrame
 from stock_data_fetch.enums import MarketType
 
 
 def make_entry(
-        daily_backtesting: DailyBacktesting,
-        price_list: List[PriceDataPerCandle], i: int,
+        daily_backtesting: DailyBacktestingRecord,
+        price_list: PriceFrame, i: int,
         entry_conditions: str,
-) -> Trade:
-    return Trade(
-        daily_backtesting=daily_backtesting,
+) -> TradeRecord:
+    return TradeRecord(
         date=daily_backtesting.date,
         expected_direction=daily_backtesting.expected_direction,
         entry_time=price_list[i]['tm'],
@@ -30,12 +32,12 @@ def make_entry(
 
 
 def make_exit(
-        trade: Trade,
-        price_list: List[PriceDataPerTick], i: int,
+        trade: TradeRecord,
+        price_list: PriceFrame, i: int,
         exit_conditions: str,
         move_catcher: IMoveCatcher,
         trade_config: TradeConfig,
-) -> Trade:
+) -> TradeRecord:
     trade.exit_time = price_list[i]['tm']
     trade.exit_conditions = exit_conditions
     trade.exit_point = move_catcher.get_exit_point(
@@ -47,7 +49,7 @@ def make_exit(
 
 
 def get_daily_backtest_result(
-        daily_backtesting: DailyBacktesting,
+        daily_backtesting: DailyBacktestingRecord,
         price_data: PriceData,
         direction: Direction,
         trade_config: TradeConfig,
@@ -61,34 +63,37 @@ def get_daily_backtest_result(
 
     price_list = price_data['price_list']
     n = len(price_list)
+    candidates = move_catcher.entry_candidates(price_list, trade_config)
     i = 0
 
     while i < n-1:
+        # skip to the next index that may make an entry
+        c = int(np.searchsorted(candidates, i))
+        if c == len(candidates):
+            break
+        i = int(candidates[c])
+        if i >= n-1:
+            break
+
         # look for entry
         should_make_entry, entry_conditions = move_catcher.should_make_entry(price_list, i, trade_config)
         if should_make_entry:
             trade = make_entry(daily_backtesting, price_list, i, entry_conditions)
 
             # look for exit
-            j = i+1
-            while j < n:
-                should_exit, exit_conditions = move_catcher.should_exit(trade, price_list, j, trade_config)
-                if should_exit or j == n-1:
-                    trade = make_exit(trade, price_list, j, exit_conditions,
-                                      move_catcher, trade_config)
-                    trade = move_catcher.calculate_gain(trade)
-
-                    daily_backtesting_result.trades.append(trade)
-                    daily_backtesting_result.daily_back_testing.trade_count += 1
-                    if move_catcher.is_winning_trade(trade, trade_config):
-                        daily_backtesting_result.daily_back_testing.winning_trade_count += 1
-                    else:
-                        daily_backtesting_result.daily_back_testing.loosing_trade_count += 1
-
-                    i = j+1
-                    break
-                else:
-                    j += 1
+            j, exit_conditions = move_catcher.find_exit(trade, price_list, i, trade_config)
+            trade = make_exit(trade, price_list, j, exit_conditions,
+                              move_catcher, trade_config)
+            trade = move_catcher.calculate_gain(trade)
+
+            daily_backtesting_result.trades.append(trade)
+            daily_backtesting_result.daily_back_testing.trade_count += 1
+            if move_catcher.is_winning_trade(trade, trade_config):
+                daily_backtesting_result.daily_back_testing.winning_trade_count += 1
+            else:
+                daily_backtesting_result.daily_back_testing.loosing_trade_count += 1
+
+            i = j+1
         else:
             i += 1
 
@@ -120,7 +125,7 @@ def fetch_and_transform_candlestick_price_data(
 
     price_data = PriceData(
         market_name=market_type,
-        price_list=[candle.to_tick_by_tick_type_data() for candle in candlestick_resp.data.candles],
+        price_list=candlestick_resp.data.to_price_frame(),
     )
 
     if len(price_data['price_list']) != 375:
@@ -167,7 +172,7 @@ def get_daily_backtest_result_for_up_and_down(
 
     daily_backtest_results = []
     for direction in [Direction.UP, Direction.DOWN]:
-        daily_backtesting = DailyBacktesting(
+        daily_backtesting = DailyBacktestingRecord(
             backtesting=back_testing,
             date=day,
             start_time=start_time,
@@ -6,6 +6,7 @@ from backtesting.enums import Market
 from typing import List
 import numpy as np
 from backtesting.momentum_1min_candle import core
+from price_app.cache import price_cache
 from price_app.handlers import fetch_price_from_database
 
 
@@ -207,6 +208,8 @@ def preload_cache_for_stock_price():
 
         day += timedelta(days=1)
 
+    print(f'price cache after preload: {price_cache.stats()}')
+
 
 def run_algo_on_test_data(optimised_params_json_file_path: str):
     back_test_input = BacktestingInput.from_json_file(
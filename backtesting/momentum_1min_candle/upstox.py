@@ -3,8 +3,11 @@ from datetime import date, datetime
 from typing import List
 import requests
 import hashlib
+import numpy as np
 
+from common.utils import to_epoch_ms
 from price_app.classes import PriceDataPerTick, PriceDataPerCandle
+from price_app.price_frame import PriceFrame
 from stock_data_fetch.enums import MarketType
 
 upstox_ts_format = "%Y-%m-%dT%H:%M:%S%z"
@@ -91,6 +94,18 @@ class UpstoxCandlesticksData:
     def _is_trading_day(self) -> bool:
         return len(self.candles) > 0
 
+    def to_price_frame(self) -> PriceFrame:
+        return PriceFrame(
+            np.array([to_epoch_ms(candle.ts) for candle in self.candles], dtype=np.int64),
+            {
+                'open': [candle.open for candle in self.candles],
+                'high': [candle.high for candle in self.candles],
+                'lo': [candle.lo for candle in self.candles],
+                'close': [candle.close for candle in self.candles],
+                'tick_price': [candle.avg_price for candle in self.candles],
+            },
+        )
+
 
 class UpstoxCandlestickResponse:
     def __init__(self, upstox_candlesticks_data: UpstoxCandlesticksData):
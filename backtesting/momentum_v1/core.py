@@ -1,21 +1,23 @@
 from datetime import timedelta, date, time
 from backtesting.constants import market_entry_time, market_exit_time
-from backtesting.entities import BacktestingInput, BacktestingResult, DailyBacktestingResult, ChartConfig, TradeConfig
+from backtesting.entities import BacktestingInput, BacktestingResult, DailyBacktestingResult, ChartConfig, TradeConfig, \
+    DailyBacktestingRecord, TradeRecord
 from backtesting.enums import BacktestingState, BacktestingStrategy, Market, Direction
-from backtesting.models import Backtesting, Trade, DailyBacktesting
+from backtesting.models import Backtesting
 from backtesting.momentum_v1.move_catcher import new_move_catcher
-from price_app.classes import PriceData, PriceDataPerTick
+from price_app.classes import PriceData
+from price_app.price_frame import PriceFrame
 from price_app.handlers import fetch_price_data
 from typing import List
+import numpy as np
 
 
 def make_entry(
-        daily_backtesting: DailyBacktesting,
-        price_list: List[PriceDataPerTick], i: int,
+        daily_backtesting: DailyBacktestingRecord,
+        price_list: PriceFrame, i: int,
         entry_conditions: str,
-) -> Trade:
-    return Trade(
-        daily_backtesting=daily_backtesting,
+) -> TradeRecord:
+    return TradeRecord(
         date=daily_backtesting.date,
         expected_direction=daily_backtesting.expected_direction,
         entry_time=price_list[i]['tm'],
@@ -29,10 +31,10 @@ def make_entry(
 
 
 def make_exit(
-        trade: Trade,
-        price_list: List[PriceDataPerTick], i: int,
+        trade: TradeRecord,
+        price_list: PriceFrame, i: int,
         exit_conditions: str,
-) -> Trade:
+) -> TradeRecord:
     trade.exit_time = price_list[i]['tm']
     trade.exit_point = price_list[i]['tick_price']
     trade.exit_conditions = exit_conditions
@@ -41,7 +43,7 @@ def make_exit(
 
 
 def get_daily_backtest_result(
-        daily_backtesting: DailyBacktesting,
+        daily_backtesting: DailyBacktestingRecord,
         price_data: PriceData,
         direction: Direction,
         trade_config: TradeConfig,
@@ -55,33 +57,36 @@ def get_daily_backtest_result(
 
     price_list = price_data['price_list']
     n = len(price_list)
+    candidates = move_catcher.entry_candidates(price_list, trade_config)
     i = 0
 
     while i < n-1:
+        # skip to the next index that may make an entry
+        c = int(np.searchsorted(candidates, i))
+        if c == len(candidates):
+            break
+        i = int(candidates[c])
+        if i >= n-1:
+            break
+
         # look for entry
         should_make_entry, entry_conditions = move_catcher.should_make_entry(price_list, i, trade_config)
         if should_make_entry:
             trade = make_entry(daily_backtesting, price_list, i, entry_conditions)
 
             # look for exit
-            j = i+1
-            while j < n:
-                should_exit, exit_conditions = move_catcher.should_exit(trade, price_list, j, trade_config)
-                if should_exit or j == n-1:
-                    trade = make_exit(trade, price_list, j, exit_conditions)
-                    trade = move_catcher.calculate_gain(trade)
-
-                    daily_backtesting_result.trades.append(trade)
-                    daily_backtesting_result.daily_back_testing.trade_count += 1
-                    if move_catcher.is_winning_trade(trade, trade_config):
-                        daily_backtesting_result.daily_back_testing.winning_trade_count += 1
-                    else:
-                        daily_backtesting_result.daily_back_testing.loosing_trade_count += 1
-
-                    i = j+1
-                    break
-                else:
-                    j += 1
+            j, exit_conditions = move_catcher.find_exit(trade, price_list, i, trade_config)
+            trade = make_exit(trade, price_list, j, exit_conditions)
+            trade = move_catcher.calculate_gain(trade)
+
+            daily_backtesting_result.trades.append(trade)
+            daily_backtesting_result.daily_back_testing.trade_count += 1
+            if move_catcher.is_winning_trade(trade, trade_config):
+                daily_backtesting_result.daily_back_testing.winning_trade_count += 1
+            else:
+                daily_backtesting_result.daily_back_testing.loosing_trade_count += 1
+
+            i = j+1
         else:
             i += 1
 
@@ -114,7 +119,7 @@ def get_daily_backtest_result_for_up_and_down(
 
     daily_backtest_results = []
     for direction in [Direction.UP, Direction.DOWN]:
-        daily_backtesting = DailyBacktesting(
+        daily_backtesting = DailyBacktestingRecord(
             backtesting=back_testing,
             date=day,
             start_time=start_time,
@@ -1,11 +1,13 @@
 from datetime import time, datetime, timedelta
 from abc import ABC, abstractmethod
-from typing import List
-from backtesting.entities import TradeConfig, LinearRegressionLine
+from typing import Optional, Tuple
+import numpy as np
+from backtesting.entities import TradeConfig, LinearRegressionLine, EntryCondition, TradeRecord
+from backtesting.entry_signals import entry_candidate_indices
+from backtesting.exits import Barrier, check_fixed_exit_condition, first_exit
 from backtesting.enums import Direction
-from backtesting.models import Trade
 from backtesting.utils import get_linear_regression_result
-from price_app.classes import PriceDataPerTick
+from price_app.price_frame import PriceFrame
 
 
 class Trendline(LinearRegressionLine):
@@ -24,23 +26,35 @@ class Trendline(LinearRegressionLine):
 class IMoveCatcher(ABC):
     exit_reason_stoploss_hit = 'sl_hit'
     exit_reason_target_hit = 'target_hit'
+    direction = 1  # of the move caught, 1 up and -1 down
 
     @abstractmethod
-    def should_make_entry(self, price_list: List[PriceDataPerTick], i: int, trade_config: TradeConfig) \
-            -> (bool, str):
+    def matching_entry_condition(self, price_list: PriceFrame, i: int, trendline: Trendline,
+                                 trade_config: TradeConfig) -> Optional[EntryCondition]:
         ...
 
     @abstractmethod
-    def should_exit(self, trade: Trade, price_list: List[PriceDataPerTick], i: int, trade_config: TradeConfig) \
+    def entry_reason(self, price_list: PriceFrame, i: int, trendline: Trendline,
+                     entry_condition: EntryCondition) -> str:
+        ...
+
+    @abstractmethod
+    def should_exit(self, trade: TradeRecord, price_list: PriceFrame, i: int, trade_config: TradeConfig) \
             -> (bool, str):
         ...
 
+    # the (stoploss, target) barriers of a trade, crossed where should_exit is true
     @abstractmethod
-    def is_winning_trade(self, trade: Trade, trade_config: TradeConfig) -> bool:
+    def exit_barriers(self, trade: TradeRecord, price_list: PriceFrame, trade_config: TradeConfig) \
+            -> Tuple[Barrier, Barrier]:
         ...
 
     @abstractmethod
-    def calculate_gain(self, trade: Trade) -> Trade:
+    def is_winning_trade(self, trade: TradeRecord, trade_config: TradeConfig) -> bool:
+        ...
+
+    @abstractmethod
+    def calculate_gain(self, trade: TradeRecord) -> TradeRecord:
         ...
 
     # def _get_index_for_start_time(self, price_list: List[PriceDataPerTick], i: int, start_time: time) -> int:
@@ -55,8 +69,43 @@ class IMoveCatcher(ABC):
     #
     #     return lo
 
-    def calculate_trend_line(self, price_list: List[PriceDataPerTick], i: int, trade_config: TradeConfig) -> Trendline:
-        end_time: time = price_list[i]['tm']
+    # (datapoint count, gap) of the trendline: the regression of the tick prices of the
+    # last 'datapoint count' ticks, every 'gap' ticks
+    def trend_line_window(self, trade_config: TradeConfig) -> Tuple[int, int]:
+        return trade_config.trend_line_time_period * 2, 10
+
+    # indices where should_make_entry may be true, see backtesting/entry_signals.py
+    def entry_candidates(self, price_list: PriceFrame, trade_config: TradeConfig) -> np.ndarray:
+        return entry_candidate_indices(price_list, trade_config, self.direction, *self.trend_line_window(trade_config))
+
+    def should_make_entry(self, price_list: PriceFrame, i: int, trade_config: TradeConfig) -> (bool, str):
+        if price_list.values('tm')[i] <= trade_config.min_entry_time:
+            return False, f"entry not allowed before min entry time {trade_config.min_entry_time}"
+
+        trendline = self.calculate_trend_line(price_list, i, trade_config)
+        if trendline is None:
+            return False, "It's too quick to know trendline"
+
+        entry_condition = self.matching_entry_condition(price_list, i, trendline, trade_config)
+        if entry_condition is None:
+            return False, "No entry criteria met"
+
+        return True, self.entry_reason(price_list, i, trendline, entry_condition)
+
+    # (exit index, exit conditions) of a trade entered at i: the first index after i where
+    # should_exit is true, else the last index, as stepping should_exit forward would give
+    def find_exit(self, trade: TradeRecord, price_list: PriceFrame, i: int, trade_config: TradeConfig) -> (int, str):
+        stoploss, target = self.exit_barriers(trade, price_list, trade_config)
+        exit_hit = first_exit(stoploss, target, i + 1)
+        if exit_hit.stoploss_hit:
+            return exit_hit.index, self.exit_reason_stoploss_hit
+        if exit_hit.target_hit:
+            return exit_hit.index, self.exit_reason_target_hit
+
+        return exit_hit.index, "no exit condition met"
+
+    def calculate_trend_line(self, price_list: PriceFrame, i: int, trade_config: TradeConfig) -> Trendline:
+        end_time: time = price_list.values('tm')[i]
 
         # today = datetime.today()
         # end_time_as_datetime = datetime.combine(today, end_time)
@@ -64,44 +113,43 @@ class IMoveCatcher(ABC):
         # start_time = start_time_as_datetime.time()
         # j = self._get_index_for_start_time(price_list, i, start_time)
 
-        datapoint_cnt = trade_config.trend_line_time_period * 2
+        datapoint_cnt, gap = self.trend_line_window(trade_config)
         j = i - datapoint_cnt
         if j < 0:
             return None
 
-        tick_prices = [price['tick_price'] for price in price_list[j:i+1]]
-        return Trendline.from_linear_regression_line(get_linear_regression_result(tick_prices, 10))
+        tick_prices = price_list.values('tick_price')[j:i+1]
+        return Trendline.from_linear_regression_line(get_linear_regression_result(tick_prices, gap))
 
 
 class UpMoveCatcher(IMoveCatcher):
-    def should_make_entry(self, price_list: List[PriceDataPerTick], i: int, trade_config: TradeConfig) -> (bool, str):
-        if price_list[i]['tm'] <= trade_config.min_entry_time:
-            return False, f"entry not allowed before min entry time {trade_config.min_entry_time}"
-
-        trendline = self.calculate_trend_line(price_list, i, trade_config)
-        if trendline is None:
-            return False, "It's too quick to know trendline"
+    direction = 1
 
+    def matching_entry_condition(self, price_list: PriceFrame, i: int, trendline: Trendline,
+                                 trade_config: TradeConfig) -> Optional[EntryCondition]:
         for entry_condition in trade_config.entry_conditions:
             if trendline.variance <= entry_condition.max_variance and \
                     trendline.m >= entry_condition.min_abs_trend_slope and \
-                    price_list[i]['slope'] >= entry_condition.min_abs_price_slope and \
-                    price_list[i]['momentum'] >= entry_condition.min_abs_price_momentum:
+                    price_list.values('slope')[i] >= entry_condition.min_abs_price_slope and \
+                    price_list.values('momentum')[i] >= entry_condition.min_abs_price_momentum:
+                return entry_condition
 
-                reason1 = (f"trendline: variance {trendline.variance} <= {entry_condition.max_variance} "
-                           f"slope {trendline.m} >= {entry_condition.min_abs_trend_slope} ")
-                reason2 = (f"price chart: slope {price_list[i]['slope']} >= {entry_condition.min_abs_price_slope} "
-                           f"momentum {price_list[i]['momentum']} >= {entry_condition.min_abs_price_momentum}")
+        return None
 
-                return True, ', '.join([reason1, reason2])
+    def entry_reason(self, price_list: PriceFrame, i: int, trendline: Trendline,
+                     entry_condition: EntryCondition) -> str:
+        reason1 = (f"trendline: variance {trendline.variance} <= {entry_condition.max_variance} "
+                   f"slope {trendline.m} >= {entry_condition.min_abs_trend_slope} ")
+        reason2 = (f"price chart: slope {price_list.values('slope')[i]} >= {entry_condition.min_abs_price_slope} "
+                   f"momentum {price_list.values('momentum')[i]} >= {entry_condition.min_abs_price_momentum}")
 
-        return False, "No entry criteria met"
+        return ', '.join([reason1, reason2])
 
-    def should_exit(self, trade: Trade, price_list: List[PriceDataPerTick], i: int, trade_config: TradeConfig) \
+    def should_exit(self, trade: TradeRecord, price_list: PriceFrame, i: int, trade_config: TradeConfig) \
             -> (bool, str):
         # 1. check stoploss trigger
         if trade_config.exit_condition.stoploss_type == 'fixed':
-            cur_tick_price = price_list[i]['tick_price']
+            cur_tick_price = price_list.values('tick_price')[i]
             lower_boundary_price = trade.entry_point - trade_config.exit_condition.stoploss_points
             if cur_tick_price <= lower_boundary_price:
                 return True, self.exit_reason_stoploss_hit
@@ -111,7 +159,7 @@ class UpMoveCatcher(IMoveCatcher):
 
         # 2. check target hit
         if trade_config.exit_condition.profit_target_type == 'fixed':
-            cur_tick_price = price_list[i]['tick_price']
+            cur_tick_price = price_list.values('tick_price')[i]
             upper_boundary_price = trade.entry_point + trade_config.exit_condition.profit_target_points
             if cur_tick_price >= upper_boundary_price:
                 return True, self.exit_reason_target_hit
@@ -121,43 +169,51 @@ class UpMoveCatcher(IMoveCatcher):
 
         return False, "no exit condition met"
 
-    def is_winning_trade(self, trade: Trade, trade_config: TradeConfig) -> bool:
+    def exit_barriers(self, trade: TradeRecord, price_list: PriceFrame, trade_config: TradeConfig) \
+            -> Tuple[Barrier, Barrier]:
+        check_fixed_exit_condition(trade_config)
+        return (
+            Barrier(price_list.column('tick_price'), trade.entry_point - trade_config.exit_condition.stoploss_points, below=True),
+            Barrier(price_list.column('tick_price'), trade.entry_point + trade_config.exit_condition.profit_target_points, below=False),
+        )
+
+    def is_winning_trade(self, trade: TradeRecord, trade_config: TradeConfig) -> bool:
         return trade.exit_point - trade.entry_point >= \
             trade_config.exit_condition.profit_target_points
 
-    def calculate_gain(self, trade: Trade) -> Trade:
+    def calculate_gain(self, trade: TradeRecord) -> TradeRecord:
         trade.gain = trade.exit_point - trade.entry_point
         return trade
 
 
 class DownMoveCatcher(IMoveCatcher):
-    def should_make_entry(self, price_list: List[PriceDataPerTick], i: int, trade_config: TradeConfig) -> (bool, str):
-        if price_list[i]['tm'] <= trade_config.min_entry_time:
-            return False, f"entry not allowed before min entry time {trade_config.min_entry_time}"
-
-        trendline = self.calculate_trend_line(price_list, i, trade_config)
-        if trendline is None:
-            return False, "It's too quick to know trendline"
+    direction = -1
 
+    def matching_entry_condition(self, price_list: PriceFrame, i: int, trendline: Trendline,
+                                 trade_config: TradeConfig) -> Optional[EntryCondition]:
         for entry_condition in trade_config.entry_conditions:
             if trendline.variance <= entry_condition.max_variance and \
                     trendline.m <= -1*entry_condition.min_abs_trend_slope and \
-                    price_list[i]['slope'] <= -1*entry_condition.min_abs_price_slope and \
-                    price_list[i]['momentum'] <= -1*entry_condition.min_abs_price_momentum:
-                reason1 = (f"trendline: variance {trendline.variance} <= {entry_condition.max_variance} "
-                           f"slope {trendline.m} <= {-1*entry_condition.min_abs_trend_slope} ")
-                reason2 = (f"price chart: slope {price_list[i]['slope']} <= {-1*entry_condition.min_abs_price_slope} "
-                           f"momentum {price_list[i]['momentum']} <= {-1*entry_condition.min_abs_price_momentum}")
+                    price_list.values('slope')[i] <= -1*entry_condition.min_abs_price_slope and \
+                    price_list.values('momentum')[i] <= -1*entry_condition.min_abs_price_momentum:
+                return entry_condition
+
+        return None
 
-                return True, ', '.join([reason1, reason2])
+    def entry_reason(self, price_list: PriceFrame, i: int, trendline: Trendline,
+                     entry_condition: EntryCondition) -> str:
+        reason1 = (f"trendline: variance {trendline.variance} <= {entry_condition.max_variance} "
+                   f"slope {trendline.m} <= {-1*entry_condition.min_abs_trend_slope} ")
+        reason2 = (f"price chart: slope {price_list.values('slope')[i]} <= {-1*entry_condition.min_abs_price_slope} "
+                   f"momentum {price_list.values('momentum')[i]} <= {-1*entry_condition.min_abs_price_momentum}")
 
-        return False, "No entry criteria met"
+        return ', '.join([reason1, reason2])
 
-    def should_exit(self, trade: Trade, price_list: List[PriceDataPerTick], i: int, trade_config: TradeConfig) \
+    def should_exit(self, trade: TradeRecord, price_list: PriceFrame, i: int, trade_config: TradeConfig) \
             -> (bool, str):
         # 1. check stoploss trigger
         if trade_config.exit_condition.stoploss_type == 'fixed':
-            cur_tick_price = price_list[i]['tick_price']
+            cur_tick_price = price_list.values('tick_price')[i]
             upper_boundary_price = trade.entry_point + trade_config.exit_condition.stoploss_points
             if cur_tick_price >= upper_boundary_price:
                 return True, self.exit_reason_stoploss_hit
@@ -167,7 +223,7 @@ class DownMoveCatcher(IMoveCatcher):
 
         # 2. check target hit
         if trade_config.exit_condition.profit_target_type == 'fixed':
-            cur_tick_price = price_list[i]['tick_price']
+            cur_tick_price = price_list.values('tick_price')[i]
             lower_boundary_price = trade.entry_point - trade_config.exit_condition.profit_target_points
             if cur_tick_price <= lower_boundary_price:
                 return True, self.exit_reason_target_hit
@@ -177,11 +233,19 @@ class DownMoveCatcher(IMoveCatcher):
 
         return False, "no exit condition met"
 
-    def is_winning_trade(self, trade: Trade, trade_config: TradeConfig) -> bool:
+    def exit_barriers(self, trade: TradeRecord, price_list: PriceFrame, trade_config: TradeConfig) \
+            -> Tuple[Barrier, Barrier]:
+        check_fixed_exit_condition(trade_config)
+        return (
+            Barrier(price_list.column('tick_price'), trade.entry_point + trade_config.exit_condition.stoploss_points, below=False),
+            Barrier(price_list.column('tick_price'), trade.entry_point - trade_config.exit_condition.profit_target_points, below=True),
+        )
+
+    def is_winning_trade(self, trade: TradeRecord, trade_config: TradeConfig) -> bool:
         return trade.entry_point - trade.exit_point >= \
             trade_config.exit_condition.profit_target_points
 
-    def calculate_gain(self, trade: Trade) -> Trade:
+    def calculate_gain(self, trade: TradeRecord) -> TradeRecord:
         trade.gain = trade.entry_point - trade.exit_point
         return trade
 
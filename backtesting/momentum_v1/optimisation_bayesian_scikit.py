@@ -7,6 +7,7 @@ from skopt import gp_minimize
 import numpy as np
 from skopt.space import Categorical
 from backtesting.momentum_v1 import core
+from price_app.cache import price_cache
 from price_app.handlers import fetch_price_from_database
 
 
@@ -199,6 +200,8 @@ def preload_cache_for_stock_price():
 
         day += timedelta(days=1)
 
+    print(f'price cache after preload: {price_cache.stats()}')
+
 
 def main():
     preload_cache_for_stock_price()
@@ -13,6 +13,7 @@ from typing import List
 import time as tm
 import numpy as np
 import signal
+from django.db import transaction
 
 from price_app.handlers import fetch_price_data
 
@@ -48,9 +49,10 @@ class OptimisationResult:
         }
 
     def save_to_db(self):
-        self.optimisation.save()
-        for backtesting_result in self.backtesting_results:
-            backtesting_result.save_to_db()
+        with transaction.atomic():
+            self.optimisation.save()
+            for backtesting_result in self.backtesting_results:
+                backtesting_result.save_to_db()
 
 
 # --------- constants -------------
@@ -1,6 +1,7 @@
 import traceback
-from typing import List
-import statistics
+from collections import deque
+from typing import List, Optional, Tuple
+import numpy as np
 from backtesting.entities import LinearRegressionLine
 
 
@@ -43,7 +44,6 @@ def get_linear_regression_result_util(nums: List[float]) -> LinearRegressionLine
         raise
 
     # Variance calculation
-    y_mean = statistics.mean(y_vals)
     variance = sum((y - (m * x + c)) ** 2 for x, y in zip(x_vals, y_vals)) / n
 
     return LinearRegressionLine(m, c, variance)
@@ -61,3 +61,126 @@ def get_linear_regression_result(nums: List[float], gap: int = 1) -> LinearRegre
         i += gap
 
     return get_linear_regression_result_util(modified_nums)
+
+
+# Regression line of the last 'n' values pushed, against x = 0 .. n-1, as
+# get_linear_regression_result_util would give it, updated in O(1) per value from running
+# sums of y, x*y and y*y. Values are taken relative to the first one pushed, which keeps the
+# sums small (prices are large) and doesn't change the slope or the variance
+class RollingLinearRegression:
+    def __init__(self, n: int):
+        if n < 2:
+            raise Exception(f"regression needs at least 2 values, n: {n}")
+
+        self.n = n
+        self.values = deque()
+        self.origin = None
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        self.sum_y_squared = 0.0
+        self.sum_x = n * (n - 1) / 2
+        self.sum_x_squared = (n - 1) * n * (2 * n - 1) / 6
+
+    def push(self, value: float):
+        if self.origin is None:
+            self.origin = value
+        y = value - self.origin
+
+        if len(self.values) == self.n:
+            oldest = self.values.popleft()
+            self.sum_y -= oldest
+            self.sum_y_squared -= oldest * oldest
+            self.sum_xy -= self.sum_y  # x of each value left goes down by 1, the oldest had x = 0
+
+        self.sum_xy += len(self.values) * y
+        self.sum_y += y
+        self.sum_y_squared += y * y
+        self.values.append(y)
+
+    def is_full(self) -> bool:
+        return len(self.values) == self.n
+
+    def line(self) -> LinearRegressionLine:
+        if not self.is_full():
+            raise Exception(f"regression needs {self.n} values, pushed: {len(self.values)}")
+
+        m, c, variance = regression_of_sums(
+            self.n, self.sum_x, self.sum_x_squared, self.sum_y, self.sum_xy, self.sum_y_squared)
+        return LinearRegressionLine(m, c + self.origin, max(variance, 0.0))
+
+
+# Trendline of get_linear_regression_result(nums[i - datapoint_cnt: i + 1], gap) for each
+# value i pushed. The values taken are those of one residue of i - datapoint_cnt modulo gap:
+# one RollingLinearRegression per residue, fed every 'gap'-th value
+class RollingTrendLine:
+    def __init__(self, datapoint_cnt: int, gap: int = 1):
+        self.datapoint_cnt = datapoint_cnt
+        self.gap = gap
+        self.regressions = [RollingLinearRegression(datapoint_cnt // gap + 1) for _ in range(gap)]
+        self.count = 0
+
+    # line of the window ending with this value, None until datapoint_cnt values came before
+    def push(self, value: float) -> Optional[LinearRegressionLine]:
+        i = self.count
+        self.count += 1
+        self.regressions[i % self.gap].push(value)
+
+        if i < self.datapoint_cnt:
+            return None
+
+        # the window starting at i - datapoint_cnt ends on i - datapoint_cnt % gap
+        return self.regressions[(i - self.datapoint_cnt % self.gap) % self.gap].line()
+
+
+def regression_of_sums(n, sum_x, sum_x_squared, sum_y, sum_xy, sum_y_squared):
+    m = (n * sum_xy - sum_x * sum_y) / (n * sum_x_squared - sum_x ** 2)
+    c = (sum_y - m * sum_x) / n
+    # sum((y - (m * x + c)) ** 2) / n, expanded
+    variance = (sum_y_squared + m * m * sum_x_squared + n * c * c
+                - 2 * m * sum_xy - 2 * c * sum_y + 2 * m * c * sum_x) / n
+
+    return m, c, variance
+
+
+# (m, c, variance) arrays of get_linear_regression_result(nums[i - datapoint_cnt: i + 1], gap)
+# for every i, NaN where i < datapoint_cnt. The values taken are those of one residue of
+# i - datapoint_cnt modulo gap: the sums of every window of each residue are numpy
+# convolutions, direct sums costing O(len(nums) * datapoint_cnt / gap) in all, not the O(1)
+# per value of RollingTrendLine. Differences of cumulative sums would be O(1) per window, but
+# drift by about 2e-5 over a day of ticks, where the convolutions stay within about 1e-10
+def get_linear_regression_arrays(nums: np.ndarray, datapoint_cnt: int, gap: int = 1) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    nums = np.asarray(nums, dtype=np.float64)
+    size = len(nums)
+    m = np.full(size, np.nan)
+    c = np.full(size, np.nan)
+    variance = np.full(size, np.nan)
+    if size <= datapoint_cnt:
+        return m, c, variance
+
+    n = datapoint_cnt // gap + 1
+    if n < 2:
+        raise Exception(f"regression needs at least 2 values, datapoint count: {datapoint_cnt}, gap: {gap}")
+    sum_x = n * (n - 1) / 2
+    sum_x_squared = (n - 1) * n * (2 * n - 1) / 6
+    ones = np.ones(n)
+    x = np.arange(n, dtype=np.float64)
+
+    origin = nums[0]
+    for residue in range(min(gap, size - datapoint_cnt)):
+        # windows starting on this residue: y[s: s + n], ending on i = residue + gap * s + datapoint_cnt
+        y = nums[residue::gap] - origin
+        ends = np.arange(residue + datapoint_cnt, size, gap)
+        y = y[:len(ends) + n - 1]
+
+        m[ends], c[ends], variance[ends] = regression_of_sums(
+            n, sum_x, sum_x_squared,
+            np.convolve(y, ones, 'valid'),
+            np.correlate(y, x, 'valid'),
+            np.convolve(y * y, ones, 'valid'),
+        )
+
+    c += origin
+    np.maximum(variance, 0.0, out=variance)
+
+    return m, c, variance
@@ -10,6 +10,21 @@ data_fetch_finish_time = market_closing_time
 nifty50_instrument_token = 256265  # taken from ZERODHA
 banknifty_instrument_token = 260105  # taken from ZERODHA
 
+# instruments followed by the live price fetch process,
+# instrument token -> price model ('<app_label>.<ModelName>') the ticks are stored in
+subscribed_instruments = {
+    nifty50_instrument_token: 'price_app.NiftyPrice',
+    banknifty_instrument_token: 'price_app.BankNiftyPrice',
+}
+
+instrument_tokens_by_market = {
+    'NIFTY': nifty50_instrument_token,
+    'BANKNIFTY': banknifty_instrument_token,
+}
+
+# resolutions of the OHLC candles rolled up from live ticks
+candle_resolutions_in_sec = [1, 5, 20, 60]
+
 IST_timezone = pytz.timezone('Asia/Kolkata')
 
 date_format_string = "%Y-%m-%d"
@@ -1,8 +1,18 @@
-from typing import TypedDict
+from datetime import datetime
+from typing import TypedDict, NamedTuple
 
 
-class TickerData(TypedDict):
+class TickerData(TypedDict, total=False):
     tradable: bool
     mode: str
     instrument_token: int
     last_price: float
+    exchange_timestamp: datetime  # only sent in 'full' mode
+    last_trade_time: datetime  # only sent in 'full' mode, for tradable instruments
+
+
+# compact form of a tick, as it travels from the websocket callback to the database
+class TickRow(NamedTuple):
+    instrument_token: int
+    epoch_ms: int
+    price: float
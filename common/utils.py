@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from .constants import *
 
 
@@ -8,3 +8,11 @@ def current_ist_timestamp() -> datetime:
 
 def now_ist() -> time:
     return current_ist_timestamp().time()
+
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    return round(timestamp.timestamp() * 1000)
+
+
+def from_epoch_ms(epoch_ms: int) -> datetime:
+    return datetime.fromtimestamp(epoch_ms / 1000, tz=timezone.utc)
@@ -1,66 +1,158 @@
 import threading
+from collections import OrderedDict
 from datetime import datetime
-from price_app.classes import PriceData
+from django.conf import settings
+from typing import Callable
+from price_app.price_frame import PriceFrame
 import hashlib
 from stock_data_fetch.enums import MarketType
 
-lock_price_info_cache = threading.Lock()
-price_info_cache: dict = {}
 datetime_str_format = "%Y-%m-%d %H:%M:%S"
 
 
-def get_price_data_cache_key(
-        market_type: str,
-        start_timestamp: str,
-        to_timestamp: str,
-        smooth_price_averaging_method: str,
-        smooth_price_period: int,
-        smooth_price_ema_period: int,
-        smooth_slope_averaging_method: str,
-        smooth_slope_period: int,
-        smooth_slope_ema_period: int,
-        smooth_momentum_period: int,
-        smooth_momentum_ema_period: int,
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.val = None
+        self.error = None
+
+
+# Byte bounded LRU of tick arrays, as returned by fetch_price_from_database. Values are
+# tuples of numpy arrays, their size is taken as the sum of the arrays' nbytes
+class PriceCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+
+        self._entries: OrderedDict = OrderedDict()
+        self._in_flight = {}  # key -> _Flight of the value being computed by get_or_compute
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def arrays_of(val) -> list:
+        return list(val)
+
+    def size_of(self, val) -> int:
+        return sum(array.nbytes for array in self.arrays_of(val))
+
+    def get(self, key: str):
+        with self._lock:
+            val = self._entries.get(key)
+            if val is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return val
+
+    # the arrays are made read only, as every hit hands out the same ones
+    def put(self, key: str, val):
+        for array in self.arrays_of(val):
+            array.flags.writeable = False
+        size = self.size_of(val)
+
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self.size_of(self._entries.pop(key))
+
+            if size > self.max_bytes:
+                return  # would evict everything else and still not fit
+
+            self._entries[key] = val
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                _, evicted_val = self._entries.popitem(last=False)
+                self.bytes -= self.size_of(evicted_val)
+                self.evictions += 1
+
+    # single flight: of concurrent calls for a key not cached, one computes and the
+    # others wait for its value (or its exception)
+    def get_or_compute(self, key, compute: Callable):
+        with self._lock:
+            val = self._entries.get(key)
+            if val is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return val
+
+            flight = self._in_flight.get(key)
+            computing = flight is None
+            if computing:
+                flight = self._in_flight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not computing:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.val
+
+        try:
+            flight.val = compute()
+            self.put(key, flight.val)
+            return flight.val
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+price_cache = PriceCache(getattr(settings, 'PRICE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+
+# Same LRU for the PriceFrames of a window with their indicators, keyed by
+# indicator_cache_key, so one entry per chart config. Hits hand out the same frame, its
+# arrays are made read only. Frames may share their tick arrays with price_cache, or with
+# each other, but they keep them alive once evicted there: every array is counted
+class IndicatorCache(PriceCache):
+    @staticmethod
+    def arrays_of(val: PriceFrame) -> list:
+        return [val.epoch_ms] + list(val.columns.values())
+
+
+indicator_cache = IndicatorCache(getattr(settings, 'INDICATOR_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+
+def indicator_cache_key(
+        market: MarketType,
+        start_timestamp: datetime,
+        end_timestamp: datetime,
+        indicator_settings: tuple,
 ) -> str:
-    concatenated_string = (
-            market_type +
-            start_timestamp +
-            to_timestamp +
-            smooth_price_averaging_method +
-            str(smooth_price_period) +
-            str(smooth_price_ema_period) +
-            smooth_slope_averaging_method +
-            str(smooth_slope_period) +
-            str(smooth_slope_ema_period) +
-            str(smooth_momentum_period) +
-            str(smooth_momentum_ema_period)
-    )
+    concatenated_string = market.name + \
+                          start_timestamp.strftime(datetime_str_format) + \
+                          end_timestamp.strftime(datetime_str_format) + \
+                          str(indicator_settings)
 
     return hashlib.md5(concatenated_string.encode()).hexdigest()
 
 
-def get_price_data_from_cache(cache_key: str) -> PriceData:
-    if cache_key in price_info_cache.keys():
-        print(f'fetching price from cache for key: {cache_key}')
-        return price_info_cache[cache_key]
-
-    return None
-
-
-def add_key_value_to_cache(key: str, val):
-    with lock_price_info_cache:
-        if key not in price_info_cache.keys():
-            print(f'adding to price cache, key: {key}')
-            price_info_cache[key] = val
-
-
-# ---------------------------------------------------------------------------
-# ---------------------------------------------------------------------------
-# ---------------------------------------------------------------------------
-
-price_cache = {}
-
-
 def cache_key(
         market: MarketType,
         start_timestamp: datetime,
@@ -75,17 +167,3 @@ def cache_key(
                           end_timestamp_str
 
     return hashlib.md5(concatenated_string.encode()).hexdigest()
-
-
-def get_from_cache(key: str):
-    if key not in price_cache:
-        print(f'price info NOT available in cache for key: {key}')
-        return None
-
-    print(f'price info  AVAILABLE in cache for key: {key}')
-    return price_cache[key]
-
-
-def add_to_cache(key: str, val):
-    print(f'adding price info to cache for key: {key}')
-    price_cache[key] = val
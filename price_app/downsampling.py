@@ -0,0 +1,106 @@
+import numpy as np
+from price_app.price_frame import PriceFrame
+
+# Downsampling of price frames for charts, done after the indicators were calculated on every
+# tick. The ticks kept are picked on one field (tick_price by default) and kept whole, with
+# every indicator, so the points of all the charts stay aligned:
+# - 'lttb': Largest Triangle Three Buckets, keeps the visual shape of the line
+# - 'minmax': the min, max and last tick of each bucket, keeps every extreme
+downsampling_methods = ['lttb', 'minmax']
+min_points = 3
+
+
+def check_downsampling_method(method: str):
+    if method not in downsampling_methods:
+        raise Exception(f'invalid downsampling: {method}, must be one of {downsampling_methods}')
+
+
+# max points given as an int (JSON) or a string of digits (query params)
+def max_points_of(value) -> int:
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < min_points:
+        raise Exception(f'invalid max_points: {value}, must be an integer >= {min_points}')
+
+    return value
+
+
+def bucket_edges(start: int, end: int, buckets: int) -> np.ndarray:
+    return np.linspace(start, end, buckets + 1).astype(np.int64)
+
+
+# always keeps the first and the last point, and one point per bucket in between: the one
+# making the largest triangle with the point kept in the previous bucket and the average
+# of the next bucket
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64) - x[0]  # epoch ms are large, keep the products precise
+    y = np.asarray(y, dtype=np.float64)
+
+    buckets = max_points - 2
+    edges = bucket_edges(1, n - 1, buckets)
+    sizes = np.diff(edges)
+    average_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes, x[n - 1])
+    average_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes, y[n - 1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(buckets):
+        lo = edges[i]
+        hi = edges[i + 1]
+        next_x = average_x[i + 1]
+        next_y = average_y[i + 1]
+
+        areas = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return selected
+
+
+# first index of each bucket where 'values' equals the bucket's 'targets'
+def first_indices_of(values: np.ndarray, targets: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    positions = np.where(values == np.repeat(targets, np.diff(edges)), np.arange(len(values)), len(values))
+    return np.minimum.reduceat(positions, edges[:-1])
+
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    edges = bucket_edges(0, n, max_points // 3)
+
+    lows = first_indices_of(y, np.minimum.reduceat(y, edges[:-1]), edges)
+    highs = first_indices_of(y, np.maximum.reduceat(y, edges[:-1]), edges)
+    lasts = edges[1:] - 1
+
+    return np.unique(np.concatenate([lows, highs, lasts]))
+
+
+def downsample(
+        price_frame: PriceFrame,
+        max_points: int,
+        method: str = 'lttb',
+        field: str = 'tick_price',
+) -> PriceFrame:
+    if max_points < min_points:
+        raise Exception(f"max points can't be < {min_points}, max points: {max_points}")
+    if len(price_frame) <= max_points:
+        return price_frame
+
+    if method == 'lttb':
+        indices = lttb_indices(price_frame.epoch_ms, price_frame.column(field), max_points)
+    elif method == 'minmax':
+        indices = minmax_indices(price_frame.column(field), max_points)
+    else:
+        check_downsampling_method(method)
+
+    return price_frame.take(indices)
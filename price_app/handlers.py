@@ -1,45 +1,68 @@
+import json
 from django import http
+from django.conf import settings
 from datetime import datetime, date, time, timedelta
-from django.http import JsonResponse
-from typing import List
+from django.http import JsonResponse, StreamingHttpResponse
+from typing import List, Tuple
 from django.views.decorators.csrf import csrf_exempt
-from common.constants import date_format_string, time_format_string, datetime_format_string
-from price_app.classes import PriceData, get_price_data_per_tick, calculate_other_auxiliary_prices
-from price_app.models import BankNiftyPrice, NiftyPrice
+from django.views.decorators.http import require_POST
+from django.db import connections
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from common.constants import date_format_string, time_format_string, \
+    instrument_tokens_by_market
+from common.utils import current_ist_timestamp
+from price_app.classes import PriceData, calculate_other_auxiliary_prices
+from price_app.live_indicators import IndicatorSettings, fetch_live_price_frame, indicator_setting_names, \
+    indicator_settings_of
+from price_app.live_stream import live_broker, ticks_by_instrument
+from price_app.downsampling import check_downsampling_method, downsample, max_points_of
+from price_app.models import Candle
+from price_app.price_formats import negotiate_price_format, iter_price_columns_json, iter_price_binary, \
+    binary_content_type
+from price_app.price_frame import PriceFrame
+from price_app.tick_store import Ticks, as_aware, get_tick_store
+from price_app.timing import stage, timed_view, timing_metrics
 from price_app.classes import price_data_to_dict
 from stock_data_fetch.enums import MarketType
 from . import configs
-from .cache import get_price_data_cache_key, get_price_data_from_cache, add_key_value_to_cache, cache_key, \
-    get_from_cache, add_to_cache
+from .cache import cache_key, price_cache, indicator_cache, indicator_cache_key
 
 
+# (epoch ms, price) arrays of the ticks, read from the configured TickStore. Windows ending
+# at or after now still receive ticks: they are read again on every call, not cached
 def fetch_price_from_database(
         market: MarketType,
         start_timestamp: datetime,
         end_timestamp: datetime,
-) -> List:
-    key = cache_key(market, start_timestamp, end_timestamp)
-    price_data = get_from_cache(key)
-    if price_data is not None:
-        return price_data
-
-    if market == MarketType.NIFTY:
-        price_data = NiftyPrice.objects.filter(
-            timestamp__gte=start_timestamp,
-            timestamp__lte=end_timestamp,
-        )
-    elif market == MarketType.BANKNIFTY:
-        price_data = BankNiftyPrice.objects.filter(
-            timestamp__gte=start_timestamp,
-            timestamp__lte=end_timestamp,
-        )
+) -> Ticks:
+    def read_ticks() -> Ticks:
+        with stage('ticks'):
+            return get_tick_store().range(market, start_timestamp, end_timestamp)
 
-    add_to_cache(key, price_data)
+    if as_aware(end_timestamp) >= current_ist_timestamp():
+        return read_ticks()
 
-    return price_data
+    return price_cache.get_or_compute(cache_key(market, start_timestamp, end_timestamp), read_ticks)
+
+
+# candles rolled up at ingestion, see stock_data_fetch/candle_aggregator.py
+def fetch_candles_from_database(
+        market: MarketType,
+        resolution_in_sec: int,
+        start_timestamp: datetime,
+        end_timestamp: datetime,
+) -> List[Candle]:
+    return list(Candle.objects.filter(
+        instrument_token=instrument_tokens_by_market[market.name],
+        resolution_in_sec=resolution_in_sec,
+        start_timestamp__gte=start_timestamp,
+        start_timestamp__lte=end_timestamp,
+    ).order_by('start_timestamp'))
 
 
-def fetch_nifty_price_data(
+def fetch_market_price_data(
+        market_type: MarketType,
         start_timestamp: datetime,
         to_timestamp: datetime,
         smooth_price_averaging_method: str,
@@ -50,106 +73,109 @@ def fetch_nifty_price_data(
         smooth_slope_ema_period: int,
         smooth_momentum_period: int,
         smooth_momentum_ema_period: int,
+        smooth_momentum_averaging_method: str = None,
 ) -> PriceData:
-    nifty_prices: List[NiftyPrice] = fetch_price_from_database(
-        MarketType.NIFTY,
+    if not isinstance(market_type, MarketType):
+        raise Exception(f'invalid market type: {market_type}')
+
+    timestamps, prices = fetch_price_from_database(
+        market_type,
         start_timestamp,
         to_timestamp,
     )
 
     price_data: PriceData = PriceData(
-        market_name=MarketType.NIFTY,
-        price_list=[get_price_data_per_tick(price_details.timestamp, price_details.tick_price)
-                    for price_details in nifty_prices]
+        market_name=market_type,
+        price_list=PriceFrame.from_ticks(timestamps, prices),
     )
 
     # optionally calculate other data points
-    calculate_other_auxiliary_prices(
-        price_data,
-        smooth_price_averaging_method,
-        smooth_price_period,
-        smooth_price_ema_period,
-        smooth_slope_averaging_method,
-        smooth_slope_period,
-        smooth_slope_ema_period,
-        smooth_momentum_period,
-        smooth_momentum_ema_period,
-    )
+    with stage('indicators'):
+        calculate_other_auxiliary_prices(
+            price_data,
+            smooth_price_averaging_method,
+            smooth_price_period,
+            smooth_price_ema_period,
+            smooth_slope_averaging_method,
+            smooth_slope_period,
+            smooth_slope_ema_period,
+            smooth_momentum_period,
+            smooth_momentum_ema_period,
+            smooth_momentum_averaging_method,
+        )
 
     return price_data
 
 
-def fetch_banknifty_price_data(
-        start_timestamp: datetime,
-        to_timestamp: datetime,
-        smooth_price_averaging_method: str,
-        smooth_price_period: int,
-        smooth_price_ema_period: int,
-        smooth_slope_averaging_method: str,
-        smooth_slope_period: int,
-        slope_ema_period: int,
-        smooth_momentum_period: int,
-        smooth_momentum_ema_period: int,
-) -> PriceData:
-    bank_nifty_prices: List[BankNiftyPrice] = fetch_price_from_database(
-        MarketType.BANKNIFTY,
-        start_timestamp,
-        to_timestamp,
-    )
-    price_data: PriceData = PriceData(
-        market_name=MarketType.BANKNIFTY,
-        price_list=[get_price_data_per_tick(price_details.timestamp, price_details.tick_price)
-                    for price_details in bank_nifty_prices]
-    )
+# PriceFrame of the ticks of the day 'windows' with their indicators, calculated over the
+# whole window as one series. The ticks are read per day, so that they come from price_cache
+def calculate_price_frame(
+        market_type: MarketType,
+        windows: List[Tuple[datetime, datetime]],
+        indicator_settings: IndicatorSettings,
+) -> PriceFrame:
+    day_frames = [
+        PriceFrame.from_ticks(*fetch_price_from_database(market_type, start_timestamp, to_timestamp))
+        for start_timestamp, to_timestamp in windows
+    ]
+    with stage('concatenate'):
+        price_data: PriceData = PriceData(
+            market_name=market_type,
+            price_list=PriceFrame.concatenate(day_frames),
+        )
 
-    # optionally calculate other data points
-    calculate_other_auxiliary_prices(
-        price_data,
-        smooth_price_averaging_method,
-        smooth_price_period,
-        smooth_price_ema_period,
-        smooth_slope_averaging_method,
-        smooth_slope_period,
-        slope_ema_period,
-        smooth_momentum_period,
-        smooth_momentum_ema_period,
-    )
+    with stage('indicators'):
+        calculate_other_auxiliary_prices(price_data, *indicator_settings)
 
-    return price_data
+    return price_data['price_list']
 
 
-def get_cached_price_data(
+# The day 'windows' with their indicators. Past windows are kept in the indicator cache.
+# Windows still receiving ticks (ending today) are not cached: with 'incremental' their
+# indicator state is kept between calls (price_app/live_indicators.py), else they are
+# calculated again
+def fetch_window_price_frame(
         market_type: MarketType,
-        start_timestamp: datetime,
-        to_timestamp: datetime,
-        smooth_price_averaging_method: str,
-        smooth_price_period: int,
-        smooth_price_ema_period: int,
-        smooth_slope_averaging_method: str,
-        smooth_slope_period: int,
-        smooth_slope_ema_period: int,
-        smooth_momentum_period: int,
-        smooth_momentum_ema_period: int,
-) -> (str, PriceData):
-    cache_key = get_price_data_cache_key(
-        market_type.name,
-        start_timestamp.strftime(datetime_format_string),
-        to_timestamp.strftime(datetime_format_string),
-        smooth_price_averaging_method,
-        smooth_price_period,
-        smooth_price_ema_period,
-        smooth_slope_averaging_method,
-        smooth_slope_period,
-        smooth_slope_ema_period,
-        smooth_momentum_period,
-        smooth_momentum_ema_period,
+        windows: List[Tuple[datetime, datetime]],
+        indicator_settings: IndicatorSettings,
+        incremental: bool,
+) -> PriceFrame:
+    if len(windows) == 0:
+        return PriceFrame.concatenate([])
+
+    start_timestamp = windows[0][0]
+    to_timestamp = windows[-1][1]
+    if to_timestamp.date() >= current_ist_timestamp().date():
+        if incremental:
+            return fetch_live_price_frame(market_type, start_timestamp, to_timestamp, indicator_settings)
+
+        return calculate_price_frame(market_type, windows, indicator_settings)
+
+    return indicator_cache.get_or_compute(
+        indicator_cache_key(market_type, start_timestamp, to_timestamp, indicator_settings),
+        lambda: calculate_price_frame(market_type, windows, indicator_settings),
     )
 
-    return cache_key, get_price_data_from_cache(cache_key)
+
+# the (start, end) timestamps of each day of the window
+def day_windows(from_date: date, to_date: date, from_time: time, to_time: time) -> List[Tuple[datetime, datetime]]:
+    windows = []
+    day = from_date
+    while day <= to_date:
+        windows.append((
+            datetime.combine(day, from_time if day == from_date else time.min),
+            datetime.combine(day, to_time if day == to_date else time.max),
+        ))
+        day += timedelta(days=1)
+
+    return windows
 
 
 # IMPORTANT FUNCTION #
-# This is the function which can be used to run optimisation algorithm
+# This is the function which can be used to run optimisation algorithm.
+# Indicators run over the whole window, multi day windows included, and are kept in the
+# indicator cache per window and indicator settings.
+# 'incremental' is for windows still receiving ticks (ending today), see fetch_window_price_frame
 def fetch_price_data(
         market_type: MarketType,
         from_date: date,
@@ -165,45 +191,39 @@ def fetch_price_data(
         smooth_slope_ema_period: int,
         smooth_momentum_period: int = None,
         smooth_momentum_ema_period: int = None,
+        smooth_momentum_averaging_method: str = None,
+        incremental: bool = False,
 ) -> PriceData:
-    start_timestamp = datetime.combine(from_date, from_time) + timedelta(microseconds=0)
-    to_timestamp = datetime.combine(to_date, to_time) + timedelta(microseconds=0)
+    if smooth_momentum_averaging_method is None:
+        smooth_momentum_averaging_method = configs.smooth_momentum_averaging_method
 
-    if market_type == MarketType.NIFTY:
-        price_data = fetch_nifty_price_data(
-            start_timestamp,
-            to_timestamp,
-            smooth_price_averaging_method,
-            smooth_price_period,
-            smooth_price_ema_period,
-            smooth_slope_averaging_method,
-            smooth_slope_period,
-            smooth_slope_ema_period,
-            smooth_momentum_period,
-            smooth_momentum_ema_period,
-        )
-    elif market_type == MarketType.BANKNIFTY:
-        price_data = fetch_banknifty_price_data(
-            start_timestamp,
-            to_timestamp,
-            smooth_price_averaging_method,
-            smooth_price_period,
-            smooth_price_ema_period,
-            smooth_slope_averaging_method,
-            smooth_slope_period,
-            smooth_slope_ema_period,
-            smooth_momentum_period,
-            smooth_momentum_ema_period,
-        )
-    else:
-        raise Exception(f'invalid market type: {market_type}')
+    indicator_settings: IndicatorSettings = (
+        smooth_price_averaging_method,
+        smooth_price_period,
+        smooth_price_ema_period,
+        smooth_slope_averaging_method,
+        smooth_slope_period,
+        smooth_slope_ema_period,
+        smooth_momentum_period,
+        smooth_momentum_ema_period,
+        smooth_momentum_averaging_method,
+    )
 
-    # add_key_value_to_cache(cache_key, price_data)
+    price_list = fetch_window_price_frame(
+        market_type,
+        day_windows(from_date, to_date, from_time, to_time),
+        indicator_settings,
+        incremental,
+    )
 
-    return price_data
+    return PriceData(
+        market_name=market_type,
+        price_list=price_list,
+    )
 
 
 @csrf_exempt
+@timed_view('price')
 def fetch_price(request: http.HttpRequest):
     market_name = MarketType(request.GET['market'])
     from_date = datetime.strptime(request.GET['from_date'], date_format_string).date()
@@ -211,35 +231,182 @@ def fetch_price(request: http.HttpRequest):
     from_time = datetime.strptime(request.GET['from_time'], time_format_string).time()
     to_time = datetime.strptime(request.GET['to_time'], time_format_string).time()
 
+    downsampling_method = request.GET.get('downsampling', 'lttb')
+
+    try:
+        price_format = negotiate_price_format(request)
+
+        # optional: at most 'max_points' ticks are sent, picked after the indicators are calculated
+        max_points = max_points_of(request.GET['max_points']) if 'max_points' in request.GET else None
+        check_downsampling_method(downsampling_method)
+
+        # optional: any of indicator_setting_names, overriding price_app/configs.py for this chart
+        indicator_settings = indicator_settings_of(
+            {name: request.GET[name] for name in indicator_setting_names if name in request.GET})
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
     info = {
         'market_name': market_name,
         'from_date': from_date,
         'to_date': to_date,
         'from_time': from_time,
         'to_time': to_time,
+        'format': price_format,
+        'max_points': max_points,
+        'downsampling': downsampling_method,
+        'indicator_settings': indicator_settings,
     }
     print(f'fetch price api: {info}')
 
-    smooth_price_period = configs.smooth_price_period
-    smooth_price_ema_period = configs.smooth_price_ema_period
-    smooth_slope_ema_period = configs.smooth_slope_ema_period
-    smooth_slope_period = configs.smooth_slope_period
-
-    smooth_momentum_period = configs.smooth_momentum_period
-    smooth_momentum_ema_period = configs.smooth_momentum_ema_period
-
     price_data: PriceData = fetch_price_data(
         MarketType(market_name),
         from_date, to_date,
         from_time, to_time,
-        configs.smooth_price_averaging_method,
-        smooth_price_period,
-        smooth_price_ema_period,
-        configs.smooth_slope_averaging_method,
-        smooth_slope_period,
-        smooth_slope_ema_period,
-        smooth_momentum_period,
-        smooth_momentum_ema_period,
+        *indicator_settings,
+        incremental=to_date >= current_ist_timestamp().date(),
     )
 
-    return JsonResponse(price_data_to_dict(price_data))
+    if max_points is not None:
+        with stage('downsample'):
+            price_data['price_list'] = downsample(price_data['price_list'], max_points, downsampling_method)
+
+    if price_format == 'columns':
+        return StreamingHttpResponse(iter_price_columns_json(price_data), content_type='application/json')
+    if price_format == 'binary':
+        return StreamingHttpResponse(iter_price_binary(price_data), content_type=binary_content_type)
+
+    with stage('encode'):
+        return JsonResponse(price_data_to_dict(price_data))
+
+
+max_batch_workers = 8
+
+
+# PriceData of several (market, indicator settings) over the same window. They are calculated
+# concurrently, so the tick ranges of the markets load at the same time, and each distinct
+# (market, indicator settings) only once. Identical concurrent loads wait on each other in
+# the caches (single flight). The workers run in copies of the caller's context, so that
+# their stages are timed as part of the request
+def fetch_price_data_batch(
+        charts: List[Tuple[MarketType, IndicatorSettings]],
+        from_date: date,
+        to_date: date,
+        from_time: time,
+        to_time: time,
+        incremental: bool = False,
+) -> List[PriceData]:
+    def fetch(chart: Tuple[MarketType, IndicatorSettings]) -> PriceData:
+        market_type, indicator_settings = chart
+        try:
+            return fetch_price_data(
+                market_type,
+                from_date, to_date,
+                from_time, to_time,
+                *indicator_settings,
+                incremental=incremental,
+            )
+        finally:
+            connections.close_all()  # of this worker thread
+
+    distinct_charts = list(dict.fromkeys(charts))
+    with ThreadPoolExecutor(max_workers=min(max_batch_workers, max(len(distinct_charts), 1))) as executor:
+        contexts = [copy_context() for _ in distinct_charts]
+        price_data_by_chart = dict(zip(distinct_charts, executor.map(
+            lambda context, chart: context.run(fetch, chart), contexts, distinct_charts)))
+
+    return [price_data_by_chart[chart] for chart in charts]
+
+
+def iter_price_batch_json(price_data_list: List[PriceData]):
+    yield '{"results": ['
+    for i, price_data in enumerate(price_data_list):
+        if i > 0:
+            yield ', '
+        yield from iter_price_columns_json(price_data)
+    yield ']}'
+
+
+# POST body: {"from_date", "to_date", "from_time", "to_time" (as for fetch_price), optional
+# "max_points" / "downsampling", and "charts": [{"market": "NIFTY", "chart_config": {...}}, ...]}
+# where chart_config optionally overrides indicator settings of price_app/configs.py, e.g.
+# {"smooth_price_period": 30}. The results come in the order of 'charts', each in the
+# 'columns' format of price_app/price_formats.py
+@csrf_exempt
+@require_POST
+@timed_view('price_batch')
+def fetch_price_batch(request: http.HttpRequest):
+    body_dict = json.loads(request.body)
+    from_date = datetime.strptime(body_dict['from_date'], date_format_string).date()
+    to_date = datetime.strptime(body_dict['to_date'], date_format_string).date()
+    from_time = datetime.strptime(body_dict['from_time'], time_format_string).time()
+    to_time = datetime.strptime(body_dict['to_time'], time_format_string).time()
+
+    max_points = body_dict.get('max_points')
+    downsampling_method = body_dict.get('downsampling', 'lttb')
+
+    try:
+        if max_points is not None:
+            max_points = max_points_of(max_points)
+        check_downsampling_method(downsampling_method)
+        charts = [
+            (MarketType(chart['market']), indicator_settings_of(chart.get('chart_config')))
+            for chart in body_dict['charts']
+        ]
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    print(f'fetch price batch api: {len(charts)} charts, {from_date} {from_time} - {to_date} {to_time}')
+
+    price_data_list = fetch_price_data_batch(
+        charts,
+        from_date, to_date,
+        from_time, to_time,
+        incremental=to_date >= current_ist_timestamp().date(),
+    )
+
+    if max_points is not None:
+        with stage('downsample'):
+            price_data_list = [
+                PriceData(
+                    market_name=price_data['market_name'],
+                    price_list=downsample(price_data['price_list'], max_points, downsampling_method),
+                )
+                for price_data in price_data_list
+            ]
+
+    return StreamingHttpResponse(iter_price_batch_json(price_data_list), content_type='application/json')
+
+
+# ticks pushed by the price fetch process (stock_data_fetch/tick_publisher.py) to the
+# subscribers of the live stream, see price_app/live_stream.py
+@csrf_exempt
+@require_POST
+def publish_ticks(request: http.HttpRequest) -> JsonResponse:
+    allowed_addresses = getattr(settings, 'TICK_PUBLISH_ALLOWED_ADDRESSES', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed_addresses:
+        return JsonResponse({'error': 'not allowed'}, status=403)
+
+    body_dict = json.loads(request.body)
+    markets_by_instrument_token = {
+        instrument_token: MarketType(market_name) for market_name, instrument_token in instrument_tokens_by_market.items()
+    }
+
+    published = 0
+    for instrument_token, (epoch_ms, prices) in ticks_by_instrument(body_dict['ticks']).items():
+        if instrument_token in markets_by_instrument_token:
+            live_broker.publish(markets_by_instrument_token[instrument_token], epoch_ms, prices)
+            published += len(epoch_ms)
+
+    return JsonResponse({'published': published, 'subscribers': live_broker.subscriber_count()})
+
+
+# stage timing histograms of the price api (price_app/timing.py) and the state of the caches
+def fetch_metrics(request: http.HttpRequest):
+    return JsonResponse({
+        'timings': timing_metrics.to_dict(),
+        'caches': {
+            'price_cache': price_cache.stats(),
+            'indicator_cache': indicator_cache.stats(),
+        },
+        'live_stream_subscribers': live_broker.subscriber_count(),
+    })
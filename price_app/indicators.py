@@ -0,0 +1,210 @@
+from typing import Dict, Union
+import numpy as np
+from scipy.signal import lfilter
+from price_app.constants import ema_smoothing
+from . import configs
+
+# Array versions of calculate_sma / calculate_ema of price_app/utils.py and of the indicator
+# chain of calculate_other_auxiliary_prices. They do the very same float operations in the very
+# same order, so results are identical to the bit, only without a python loop per tick
+
+
+# same as calculate_sma: the running sum adds x[i] and, from i = period on, subtracts x[i-period].
+# Accumulating the interleaved sequence x[0..period-1], x[period], -x[0], x[period+1], -x[1], ...
+# reproduces every intermediate sum of that loop (np.add.accumulate is strictly sequential)
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    if period < 1:
+        raise Exception(f"period can't be < 1, period: {period}")
+
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= period:
+        sums = np.add.accumulate(values)
+    else:
+        steps = np.empty(period + 2 * (n - period), dtype=np.float64)
+        steps[:period] = values[:period]
+        steps[period::2] = values[period:]
+        steps[period + 1::2] = -values[:n - period]
+
+        running_sums = np.add.accumulate(steps)
+        sums = np.concatenate([running_sums[:period], running_sums[period + 1::2]])
+
+    smas = sums / period
+    smas[:period - 1] = values[:period - 1]  # not enough ticks yet for an average
+
+    return smas
+
+
+# same as calculate_ema: seeded with the sma of the first 'period' values, then
+# ema[i] = alpha * x[i] + (1 - alpha) * ema[i-1]. lfilter evaluates this recursion as
+# b0 * x[i] + (-a1 * y[i-1]), which rounds exactly like the python expression
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < period:
+        raise Exception(f'not enough values for ema, values: {len(values)}, period: {period}')
+
+    seed = np.add.accumulate(values[:period])[-1] / period
+
+    smoothing_factor = ema_smoothing / (period + 1)
+    emas = np.empty(len(values), dtype=np.float64)
+    emas[0] = seed
+    if len(values) > 1:
+        emas[1:], _ = lfilter(
+            [smoothing_factor],
+            [1.0, -(1 - smoothing_factor)],
+            values[1:],
+            zi=[(1 - smoothing_factor) * seed],
+        )
+
+    return emas
+
+
+def smooth(values: np.ndarray, averaging_method: str, period: int) -> np.ndarray:
+    if averaging_method == 'exponential':
+        return ema(values, period)
+
+    return sma(values, period)  # 'simple', and the default for anything else
+
+
+averaging_methods = ['simple', 'exponential']
+
+
+# Every indicator of PriceDataPerTick, keyed by its name there, computed from the tick prices.
+# Smooth momentum is averaged as in price_app/configs.py unless its method is given
+def calculate_indicators(
+        tick_prices: np.ndarray,
+        smooth_price_averaging_method: str,
+        smooth_price_period: int,
+        smooth_price_ema_period: int,
+        smooth_slope_averaging_method: str,
+        smooth_slope_period: int,
+        smooth_slope_ema_period: int,
+        smooth_momentum_period: int = None,
+        smooth_momentum_ema_period: int = None,
+        smooth_momentum_averaging_method: str = None,
+) -> Dict[str, np.ndarray]:
+    if smooth_momentum_averaging_method is None:
+        smooth_momentum_averaging_method = configs.smooth_momentum_averaging_method
+
+    indicators: Dict[str, np.ndarray] = {}
+
+    smooth_price = smooth(tick_prices, smooth_price_averaging_method, smooth_price_period)
+    smooth_price_ema = ema(smooth_price, smooth_price_ema_period)
+    indicators['smooth_price'] = smooth_price
+    indicators['smooth_price_ema'] = smooth_price_ema
+
+    slope = smooth_price - smooth_price_ema
+    smooth_slope = smooth(slope, smooth_slope_averaging_method, smooth_slope_period)
+    smooth_slope_ema = ema(smooth_slope, smooth_slope_ema_period)
+    indicators['slope'] = slope
+    indicators['smooth_slope'] = smooth_slope
+    indicators['smooth_slope_ema'] = smooth_slope_ema
+
+    momentum = smooth_slope - smooth_slope_ema
+    indicators['momentum'] = momentum
+
+    if smooth_momentum_period is not None:
+        indicators['smooth_momentum'] = smooth(momentum, smooth_momentum_averaging_method, smooth_momentum_period)
+
+    if smooth_momentum_ema_period is not None:
+        if 'smooth_momentum' not in indicators:
+            raise Exception('smooth momentum is not calculated. Hence '
+                            'smooth momentum ema can\'t be calculated')
+        indicators['smooth_momentum_ema'] = ema(indicators['smooth_momentum'], smooth_momentum_ema_period)
+
+    if smooth_momentum_period is not None and smooth_momentum_ema_period is not None:
+        indicators['momentum_rate'] = indicators['smooth_momentum'] - indicators['smooth_momentum_ema']
+
+    return indicators
+
+
+# Incremental versions of sma / ema for series that keep growing (the live day): 'update' takes
+# the values appended since the last call and returns the averages they complete, carrying the
+# running sum / last ema over, so that the results are identical to the bit to sma / ema of the
+# whole series
+class RollingSMA:
+    def __init__(self, period: int):
+        if period < 1:
+            raise Exception(f"period can't be < 1, period: {period}")
+
+        self.period = period
+        self.count = 0
+        self.sum = 0.0
+        self.tail = np.empty(0, dtype=np.float64)  # the last 'period' values
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return np.empty(0, dtype=np.float64)
+
+        period = self.period
+        history = np.concatenate([self.tail, values])
+
+        # the first values (up to index period - 1 of the series) only add to the sum,
+        # the later ones also subtract the value 'period' places before them
+        adds_only = min(n, max(0, period - self.count))
+        dropped = history[len(self.tail) + adds_only - period:len(self.tail) + n - period]
+
+        steps = np.empty(1 + adds_only + 2 * (n - adds_only), dtype=np.float64)
+        steps[0] = self.sum
+        steps[1:1 + adds_only] = values[:adds_only]
+        steps[1 + adds_only::2] = values[adds_only:]
+        steps[2 + adds_only::2] = -dropped
+
+        running_sums = np.add.accumulate(steps)
+        sums = np.concatenate([running_sums[1:1 + adds_only], running_sums[2 + adds_only::2]])
+
+        smas = sums / period
+        not_averaged = min(n, max(0, period - 1 - self.count))
+        smas[:not_averaged] = values[:not_averaged]
+
+        self.count += n
+        self.sum = running_sums[-1]
+        self.tail = history[-period:].copy()
+
+        return smas
+
+
+# returns nothing until 'period' values came in (the ema is seeded with their sma),
+# then the emas of all of them at once
+class RollingEMA:
+    def __init__(self, period: int):
+        self.period = period
+        self.smoothing_factor = ema_smoothing / (period + 1)
+        self.count = 0
+        self.pending = np.empty(0, dtype=np.float64)
+        self.last = None
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        self.count += len(values)
+
+        if self.last is None:
+            self.pending = np.concatenate([self.pending, values])
+            if len(self.pending) < self.period:
+                return np.empty(0, dtype=np.float64)
+
+            emas = ema(self.pending, self.period)
+            self.pending = np.empty(0, dtype=np.float64)
+        elif len(values) == 0:
+            return np.empty(0, dtype=np.float64)
+        else:
+            smoothing_factor = self.smoothing_factor
+            emas, _ = lfilter(
+                [smoothing_factor],
+                [1.0, -(1 - smoothing_factor)],
+                values,
+                zi=[(1 - smoothing_factor) * self.last],
+            )
+
+        self.last = emas[-1]
+
+        return emas
+
+
+def rolling_smoother(averaging_method: str, period: int) -> Union[RollingSMA, RollingEMA]:
+    if averaging_method == 'exponential':
+        return RollingEMA(period)
+
+    return RollingSMA(period)
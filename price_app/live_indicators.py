@@ -0,0 +1,247 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Tuple
+import numpy as np
+from common.utils import to_epoch_ms, from_epoch_ms
+from price_app.indicators import RollingEMA, averaging_methods, rolling_smoother
+from price_app.price_frame import PriceFrame
+from price_app.tick_store import as_aware, get_tick_store
+from price_app.timing import stage
+from stock_data_fetch.enums import MarketType
+from . import configs
+
+# Indicator state of the live day. The chart polls /api/price with the same window while ticks
+# keep coming in: instead of computing every indicator again from the first tick of the window,
+# the running sums / emas of each step of the indicator chain are kept per (market, window start,
+# indicator settings), and only the ticks that arrived since the last poll are fed through them
+
+max_live_states = 16
+max_indicator_period = 100000
+
+# the arguments of calculate_indicators, in this order
+indicator_setting_names = [
+    'smooth_price_averaging_method',
+    'smooth_price_period',
+    'smooth_price_ema_period',
+    'smooth_slope_averaging_method',
+    'smooth_slope_period',
+    'smooth_slope_ema_period',
+    'smooth_momentum_period',
+    'smooth_momentum_ema_period',
+    'smooth_momentum_averaging_method',
+]
+IndicatorSettings = Tuple[str, int, int, str, int, int, int, int, str]
+
+
+# a period given as an int (JSON) or a string of digits (query params)
+def indicator_period_of(name: str, value) -> int:
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= max_indicator_period:
+        raise Exception(f'invalid {name}: {value}, must be an integer from 1 to {max_indicator_period}')
+
+    return value
+
+
+# the settings of price_app/configs.py, with 'overrides' (by setting name) applied and validated
+def indicator_settings_of(overrides: dict = None) -> IndicatorSettings:
+    overrides = overrides or {}
+    unknown_names = [name for name in overrides if name not in indicator_setting_names]
+    if len(unknown_names) > 0:
+        raise Exception(f'unknown indicator settings: {unknown_names}, must be among {indicator_setting_names}')
+
+    settings = []
+    for name in indicator_setting_names:
+        value = overrides.get(name, getattr(configs, name))
+        if name.endswith('_averaging_method'):
+            if value not in averaging_methods:
+                raise Exception(f'invalid {name}: {value}, must be one of {averaging_methods}')
+        else:
+            value = indicator_period_of(name, value)
+        settings.append(value)
+
+    return tuple(settings)
+
+
+# numpy array appended to in place, with amortised O(1) appends
+class GrowingArray:
+    def __init__(self, dtype):
+        self._values = np.empty(1024, dtype=dtype)
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def extend(self, values: np.ndarray):
+        end = self._length + len(values)
+        if end > len(self._values):
+            grown = np.empty(max(end, 2 * len(self._values)), dtype=self._values.dtype)
+            grown[:self._length] = self._values[:self._length]
+            self._values = grown
+
+        self._values[self._length:end] = values
+        self._length = end
+
+    # read only, later appends don't change it
+    def view(self) -> np.ndarray:
+        values = self._values[:self._length]
+        values.flags.writeable = False
+        return values
+
+
+# The indicator chain of price_app/indicators.py calculate_indicators, step by step. Every
+# series is kept for the whole window, each step consumes what its input series gained
+class LiveIndicators:
+    def __init__(self, market: MarketType, start_timestamp: datetime, settings: IndicatorSettings):
+        (smooth_price_averaging_method, smooth_price_period, smooth_price_ema_period,
+         smooth_slope_averaging_method, smooth_slope_period, smooth_slope_ema_period,
+         smooth_momentum_period, smooth_momentum_ema_period, smooth_momentum_averaging_method) = settings
+
+        if smooth_momentum_ema_period is not None and smooth_momentum_period is None:
+            raise Exception('smooth momentum is not calculated. Hence '
+                            'smooth momentum ema can\'t be calculated')
+
+        self.market = market
+        self.start_timestamp = as_aware(start_timestamp)
+        self.lock = threading.Lock()
+
+        self.epoch_ms = GrowingArray(np.int64)
+        self.ticks_at_last_ms = 0  # ticks processed with the last timestamp
+
+        # (name, input series, rolling average) and (name, series, series subtracted)
+        self.steps = [
+            ('smooth_price', 'tick_price', rolling_smoother(smooth_price_averaging_method, smooth_price_period)),
+            ('smooth_price_ema', 'smooth_price', RollingEMA(smooth_price_ema_period)),
+            ('slope', ('smooth_price', 'smooth_price_ema'), None),
+            ('smooth_slope', 'slope', rolling_smoother(smooth_slope_averaging_method, smooth_slope_period)),
+            ('smooth_slope_ema', 'smooth_slope', RollingEMA(smooth_slope_ema_period)),
+            ('momentum', ('smooth_slope', 'smooth_slope_ema'), None),
+        ]
+        if smooth_momentum_period is not None:
+            self.steps.append(('smooth_momentum', 'momentum', rolling_smoother(
+                smooth_momentum_averaging_method, smooth_momentum_period)))
+        if smooth_momentum_ema_period is not None:
+            self.steps.append(('smooth_momentum_ema', 'smooth_momentum', RollingEMA(smooth_momentum_ema_period)))
+            self.steps.append(('momentum_rate', ('smooth_momentum', 'smooth_momentum_ema'), None))
+
+        self.series: Dict[str, GrowingArray] = {'tick_price': GrowingArray(np.float64)}
+        for name, _, _ in self.steps:
+            self.series[name] = GrowingArray(np.float64)
+
+    def add_ticks(self, epoch_ms: np.ndarray, prices: np.ndarray):
+        if len(epoch_ms) == 0:
+            return
+
+        last_ms = int(epoch_ms[-1])
+        if len(self.epoch_ms) > 0 and last_ms == self.epoch_ms.view()[-1]:
+            self.ticks_at_last_ms += int(np.count_nonzero(epoch_ms == last_ms))
+        else:
+            self.ticks_at_last_ms = int(np.count_nonzero(epoch_ms == last_ms))
+
+        self.epoch_ms.extend(epoch_ms)
+        self.series['tick_price'].extend(prices)
+
+        for name, source, rolling in self.steps:
+            series = self.series[name]
+            if rolling is not None:
+                series.extend(rolling.update(self.series[source].view()[rolling.count:]))
+            else:
+                minuend = self.series[source[0]].view()
+                subtrahend = self.series[source[1]].view()
+                end = min(len(minuend), len(subtrahend))
+                series.extend(minuend[len(series):end] - subtrahend[len(series):end])
+
+    # the ticks so far, e.g. to seed the state of other settings without reading them again
+    def ticks(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.epoch_ms.view(), self.series['tick_price'].view()
+
+    # reads the ticks that came in since the last call, up to 'end_timestamp'. Ticks are
+    # expected to arrive in time order: one stored late with an older timestamp is missed
+    def update(self, end_timestamp: datetime):
+        if len(self.epoch_ms) == 0:
+            start_timestamp = self.start_timestamp
+            skip = 0
+        else:
+            # the last timestamp is read again: ticks of that same ms may have been stored since
+            last_ms = int(self.epoch_ms.view()[-1])
+            start_timestamp = from_epoch_ms(last_ms)
+            skip = self.ticks_at_last_ms
+
+        end_timestamp = as_aware(end_timestamp)
+        if end_timestamp < start_timestamp:
+            return
+
+        with stage('ticks'):
+            epoch_ms, prices = get_tick_store().range(self.market, start_timestamp, end_timestamp)
+        with stage('indicators'):
+            self.add_ticks(epoch_ms[skip:], prices[skip:])
+
+    # number of ticks with every indicator calculated, the emas only start once seeded
+    def complete_length(self) -> int:
+        return min(len(series) for series in self.series.values())
+
+    # the ticks [start, end) with their indicators, sharing the (read only) arrays
+    def rows(self, start: int, end: int) -> PriceFrame:
+        return PriceFrame(
+            self.epoch_ms.view()[start:end],
+            {name: series.view()[start:end] for name, series in self.series.items()},
+        )
+
+    # the ticks up to 'end_timestamp' with their indicators
+    def price_frame(self, end_timestamp: datetime) -> PriceFrame:
+        epoch_ms = self.epoch_ms.view()
+        n = int(np.searchsorted(epoch_ms, to_epoch_ms(as_aware(end_timestamp)), side='right'))
+
+        for name, series in self.series.items():
+            if len(series) < n:
+                raise Exception(f'not enough ticks yet for {name}, ticks: {n}')
+
+        return self.rows(0, n)
+
+
+_live_indicators: OrderedDict = OrderedDict()
+_lock_live_indicators = threading.Lock()
+
+
+# A new state takes the ticks already read by a state of other settings of the same window,
+# so that trying settings on the live chart reads only the new ticks from the TickStore
+def get_live_indicators(market: MarketType, start_timestamp: datetime, settings: IndicatorSettings) -> LiveIndicators:
+    key = (market, as_aware(start_timestamp), settings)
+    sibling = None
+    with _lock_live_indicators:
+        live_indicators = _live_indicators.get(key)
+        if live_indicators is None:
+            for (other_market, other_start_timestamp, _), other in reversed(_live_indicators.items()):
+                if other_market == key[0] and other_start_timestamp == key[1]:
+                    sibling = other
+                    break
+
+            live_indicators = LiveIndicators(market, start_timestamp, settings)
+            _live_indicators[key] = live_indicators
+            while len(_live_indicators) > max_live_states:
+                _live_indicators.popitem(last=False)
+        else:
+            _live_indicators.move_to_end(key)
+
+    if sibling is not None:
+        with live_indicators.lock:
+            if len(live_indicators.epoch_ms) == 0:
+                with sibling.lock:
+                    live_indicators.add_ticks(*sibling.ticks())
+
+    return live_indicators
+
+
+# price frame of the ticks in [start_timestamp, end_timestamp] with every indicator,
+# computing only those of the ticks not seen by the previous calls
+def fetch_live_price_frame(
+        market: MarketType,
+        start_timestamp: datetime,
+        end_timestamp: datetime,
+        settings: IndicatorSettings,
+) -> PriceFrame:
+    live_indicators = get_live_indicators(market, start_timestamp, settings)
+    with live_indicators.lock:
+        live_indicators.update(end_timestamp)
+        return live_indicators.price_frame(end_timestamp)
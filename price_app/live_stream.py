@@ -0,0 +1,315 @@
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+import numpy as np
+from asgiref.sync import sync_to_async
+from common.constants import time_format_string
+from common.utils import current_ist_timestamp, to_epoch_ms
+from price_app.classes import PriceData
+from price_app.constants import MARKET_START_TIME
+from price_app.live_indicators import IndicatorSettings, LiveIndicators, indicator_setting_names, \
+    indicator_settings_of
+from price_app.price_formats import iter_price_columns_json
+from price_app.price_frame import PriceFrame
+from stock_data_fetch.enums import MarketType
+
+# Server-Sent Events push of live ticks with their indicators, served straight by the ASGI
+# application (stock_data_fetch/asgi.py) on 'price_stream_path', as django 4.0 can't stream
+# asynchronously. The price fetch process POSTs every batch of ticks to the publish endpoint
+# (price_app/handlers.py publish_ticks), which hands them to 'live_broker'. The broker keeps
+# one LiveIndicators per (market, window start, indicator settings) subscribed to, seeded
+# from the TickStore on the first subscription, and sends each subscriber the new rows.
+# A client first fetches /api/price, then subscribes with 'after' = its last epoch ms, e.g.
+#   /api/price/stream?market=NIFTY&from_time=09:15:00&after=1726804377402
+# with the indicator settings of the /api/price request if it overrode any, e.g. &smooth_price_period=30
+# Events: 'id' is the epoch ms of the last tick sent (EventSource sends it back on reconnect
+# as Last-Event-ID), 'data' the new rows in the 'columns' JSON format of price_formats.py
+
+price_stream_path = '/api/price/stream'
+max_queued_events = 1000  # a subscriber this far behind is disconnected, and reconnects
+# ticks published this recently are kept, to seed new groups with those the TickStore
+# doesn't have yet: they reach mysql through the spill log, later than the publish
+recent_ticks_in_ms = 30 * 1000
+keep_alive_in_sec = 15
+
+
+def sse_event(event: str, data: str, event_id: Optional[int] = None) -> bytes:
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {data}')
+
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+def rows_event(market: MarketType, rows: PriceFrame) -> bytes:
+    data = ''.join(iter_price_columns_json(PriceData(market_name=market, price_list=rows)))
+    return sse_event('ticks', data, int(rows.epoch_ms[-1]))
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued_events)
+        self.overflowed = False
+
+    # called from any thread
+    def offer(self, event: bytes):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: bytes):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class LiveGroup:
+    def __init__(
+            self,
+            key: Tuple,
+            market: MarketType,
+            start_timestamp: datetime,
+            settings: IndicatorSettings,
+            published: List[Tuple[np.ndarray, np.ndarray]],
+    ):
+        self.key = key
+        self.market = market
+        self.indicators = LiveIndicators(market, start_timestamp, settings)
+        self.subscribers: Set[Subscriber] = set()
+        self.subscribing = 0  # subscriptions under way, the group must not be dropped meanwhile
+        self.sent = 0  # rows sent to the subscribers
+        self.seeded = False
+        self.pending = list(published)  # (epoch ms, prices) published before the seed
+        self.published_at_last_ms = 0  # ticks published with the last timestamp read
+        self.lock = threading.Lock()
+
+    # reads the ticks so far from the TickStore, then adds the published ones it doesn't have
+    # yet: the recent ones of when the group was made, and those published since
+    def seed(self):
+        if self.seeded:
+            return
+
+        self.indicators.update(current_ist_timestamp())
+        if len(self.pending) > 0:
+            self._add_published(
+                np.concatenate([epoch_ms for epoch_ms, _ in self.pending]),
+                np.concatenate([prices for _, prices in self.pending]),
+            )
+        self.pending = []
+        self.sent = self.indicators.complete_length()
+        self.seeded = True
+
+    # Ticks come in time order, from the TickStore and published, and both may have some of
+    # the ticks of the last timestamp read: of the ticks published with it, as many as were
+    # read are taken to be those already read, the others are added
+    def _add_published(self, epoch_ms: np.ndarray, prices: np.ndarray):
+        last_ms = int(self.indicators.epoch_ms.view()[-1]) if len(self.indicators.epoch_ms) > 0 else None
+        if last_ms is None:
+            in_window = epoch_ms >= to_epoch_ms(self.indicators.start_timestamp)
+            epoch_ms = epoch_ms[in_window]
+            prices = prices[in_window]
+        else:
+            older = int(np.count_nonzero(epoch_ms < last_ms))
+            at_last_ms = int(np.count_nonzero(epoch_ms == last_ms))
+            published_at_last_ms = self.published_at_last_ms + at_last_ms
+            new_at_last_ms = min(at_last_ms, max(0, published_at_last_ms - self.indicators.ticks_at_last_ms))
+            self.published_at_last_ms = published_at_last_ms
+
+            skip = older + at_last_ms - new_at_last_ms
+            epoch_ms = epoch_ms[skip:]
+            prices = prices[skip:]
+
+        if len(epoch_ms) == 0:
+            return
+
+        self.indicators.add_ticks(epoch_ms, prices)
+        if epoch_ms[-1] != last_ms:
+            self.published_at_last_ms = int(np.count_nonzero(epoch_ms == epoch_ms[-1]))
+
+    def add_ticks(self, epoch_ms: np.ndarray, prices: np.ndarray):
+        with self.lock:
+            if not self.seeded:
+                self.pending.append((epoch_ms, prices))
+                return
+
+            self._add_published(epoch_ms, prices)
+
+            complete = self.indicators.complete_length()
+            if complete == self.sent:
+                return
+            event = rows_event(self.market, self.indicators.rows(self.sent, complete))
+            self.sent = complete
+
+            for subscriber in self.subscribers:
+                subscriber.offer(event)
+
+
+class LiveBroker:
+    def __init__(self):
+        self._groups: Dict[Tuple, LiveGroup] = {}
+        self._recent: Dict[MarketType, deque] = {}  # market -> (epoch ms, prices) of the last publishes
+        self._lock = threading.Lock()
+
+    # returns the group subscribed to and the event of the rows after 'after_ms' (None for
+    # just the new ones). Blocking: the first subscription of a group reads the ticks so far
+    def subscribe(
+            self,
+            subscriber: Subscriber,
+            market: MarketType,
+            start_timestamp: datetime,
+            settings: IndicatorSettings,
+            after_ms: Optional[int],
+    ) -> Tuple[LiveGroup, Optional[bytes]]:
+        key = (market, start_timestamp, settings)
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = LiveGroup(
+                    key, market, start_timestamp, settings, list(self._recent.get(market, [])),
+                )
+            group.subscribing += 1
+
+        try:
+            with group.lock:
+                group.seed()
+
+                missed = None
+                if after_ms is not None:
+                    sent_epoch_ms = group.indicators.epoch_ms.view()[:group.sent]
+                    start = int(np.searchsorted(sent_epoch_ms, after_ms, side='right'))
+                    if start < group.sent:
+                        missed = rows_event(market, group.indicators.rows(start, group.sent))
+
+                group.subscribers.add(subscriber)
+        finally:
+            self._release(group)
+
+        return group, missed
+
+    def unsubscribe(self, group: LiveGroup, subscriber: Subscriber):
+        self._release(group, subscriber)
+
+    # ends a subscription under way, or a subscription. A group left without either is
+    # dropped, the next subscription seeds it again
+    def _release(self, group: LiveGroup, subscriber: Subscriber = None):
+        with self._lock:
+            with group.lock:
+                if subscriber is None:
+                    group.subscribing -= 1
+                else:
+                    group.subscribers.discard(subscriber)
+
+                if len(group.subscribers) == 0 and group.subscribing == 0 and self._groups.get(group.key) is group:
+                    del self._groups[group.key]
+
+    def publish(self, market: MarketType, epoch_ms: np.ndarray, prices: np.ndarray):
+        if len(epoch_ms) == 0:
+            return
+
+        with self._lock:
+            recent = self._recent.setdefault(market, deque())
+            recent.append((epoch_ms, prices))
+            while recent[0][0][-1] < epoch_ms[-1] - recent_ticks_in_ms:
+                recent.popleft()
+
+            groups = [group for (group_market, _, _), group in self._groups.items() if group_market == market]
+
+        for group in groups:
+            group.add_ticks(epoch_ms, prices)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(group.subscribers) for group in self._groups.values())
+
+
+live_broker = LiveBroker()
+
+
+async def send_response_start(send, status: int, content_type: bytes):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type),
+            (b'cache-control', b'no-cache'),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def price_stream_app(scope, receive, send):
+    params = {key: values[0] for key, values in parse_qs(scope['query_string'].decode()).items()}
+    headers = dict(scope['headers'])
+
+    try:
+        market = MarketType(params['market'])
+        from_time = datetime.strptime(params['from_time'], time_format_string).time() \
+            if 'from_time' in params else MARKET_START_TIME
+        # on reconnect, EventSource requests the same url again: its Last-Event-ID comes first
+        after = headers.get(b'last-event-id', b'').decode() or params.get('after')
+        after_ms = int(after) if after is not None else None
+        settings = indicator_settings_of({name: params[name] for name in indicator_setting_names if name in params})
+    except Exception as e:
+        await send_response_start(send, 400, b'text/plain')
+        await send({'type': 'http.response.body', 'body': f'invalid request: {e}'.encode()})
+        return
+
+    start_timestamp = datetime.combine(current_ist_timestamp().date(), from_time)
+    subscriber = Subscriber(asyncio.get_running_loop())
+    group, missed = await sync_to_async(live_broker.subscribe)(
+        subscriber, market, start_timestamp, settings, after_ms,
+    )
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    next_event = None
+    try:
+        await send_response_start(send, 200, b'text/event-stream')
+        if missed is not None:
+            await send({'type': 'http.response.body', 'body': missed, 'more_body': True})
+
+        while not subscriber.overflowed:
+            if next_event is None:
+                next_event = asyncio.ensure_future(subscriber.queue.get())
+
+            done, _ = await asyncio.wait({next_event, disconnected}, timeout=keep_alive_in_sec,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                break
+
+            if next_event in done:
+                body = next_event.result()
+                next_event = None
+            else:
+                body = b': keep alive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+        if subscriber.overflowed:
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        for task in (next_event, disconnected):
+            if task is not None and not task.done():
+                task.cancel()
+        live_broker.unsubscribe(group, subscriber)
+
+
+# body of a publish request: {"ticks": [[instrument_token, epoch_ms, price], ...]}
+def ticks_by_instrument(ticks: List[List]) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    by_instrument = {}
+    for instrument_token, epoch_ms, price in ticks:
+        instrument_epoch_ms, instrument_prices = by_instrument.setdefault(int(instrument_token), ([], []))
+        instrument_epoch_ms.append(epoch_ms)
+        instrument_prices.append(price)
+
+    return {
+        instrument_token: (np.array(epoch_ms, dtype=np.int64), np.array(prices, dtype=np.float64))
+        for instrument_token, (epoch_ms, prices) in by_instrument.items()
+    }
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand
+from common.utils import current_ist_timestamp
+from price_app.tick_archive import TickArchive, date_format
+from stock_data_fetch.enums import MarketType
+
+
+# Writes finished trading days to the columnar tick archive, see price_app/tick_archive.py.
+# Days already archived are skipped unless --overwrite is given. e.g.
+#   python manage.py archive_ticks 2024-09-01 2024-09-30
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('from_date', help='YYYY-MM-DD')
+        parser.add_argument('to_date', nargs='?', help='YYYY-MM-DD, inclusive. Defaults to yesterday')
+        parser.add_argument('--market', choices=[m.name for m in MarketType], help='all markets by default')
+        parser.add_argument('--overwrite', action='store_true')
+
+    def handle(self, *args, **options):
+        today = current_ist_timestamp().date()
+        from_date = datetime.strptime(options['from_date'], date_format).date()
+        to_date = datetime.strptime(options['to_date'], date_format).date() \
+            if options['to_date'] is not None else today - timedelta(days=1)
+        if to_date >= today:
+            raise Exception(f'only finished trading days can be archived, to_date must be before {today}')
+
+        markets = [MarketType[options['market']]] if options['market'] is not None else list(MarketType)
+        archive = TickArchive()
+
+        day = from_date
+        while day <= to_date:
+            for market in markets:
+                if archive.has_day(market, day) and not options['overwrite']:
+                    print(f'{market.name} {day}: already archived')
+                    continue
+
+                tick_cnt = archive.archive_day(market, day, options['overwrite'])
+                print(f'{market.name} {day}: {tick_cnt} ticks archived')
+
+            day += timedelta(days=1)
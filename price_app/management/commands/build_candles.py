@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from common.constants import instrument_tokens_by_market, subscribed_instruments, \
+    IST_timezone
+from common.entities import TickRow
+from common.utils import to_epoch_ms
+from stock_data_fetch.candle_aggregator import CandleAggregator, bulk_create_candles
+from stock_data_fetch.enums import MarketType
+
+
+# Backfills the 'candle' table from the ticks already stored, e.g. for the days
+# recorded before candles were rolled up at ingestion. Existing candles are kept as they are
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('from_date', help='YYYY-MM-DD')
+        parser.add_argument('to_date', help='YYYY-MM-DD, inclusive')
+        parser.add_argument('--market', default=MarketType.NIFTY.name, choices=[m.name for m in MarketType])
+
+    def handle(self, *args, **options):
+        market = MarketType[options['market']]
+        instrument_token = instrument_tokens_by_market[market.name]
+        price_model = apps.get_model(subscribed_instruments[instrument_token])
+        from_date = IST_timezone.localize(datetime.strptime(options['from_date'], '%Y-%m-%d'))
+        to_date = IST_timezone.localize(datetime.strptime(options['to_date'], '%Y-%m-%d'))
+
+        day = from_date
+        while day <= to_date:
+            candle_cnt = 0
+
+            def write_candles(candles):
+                nonlocal candle_cnt
+                bulk_create_candles(candles)
+                candle_cnt += len(candles)
+
+            aggregator = CandleAggregator(write_candles)
+            prices = price_model.objects.filter(
+                timestamp__gte=day,
+                timestamp__lt=day + timedelta(days=1),
+            ).order_by('timestamp')
+            aggregator.add_rows([
+                TickRow(instrument_token, to_epoch_ms(price.timestamp), price.tick_price)
+                for price in prices.iterator()
+            ])
+            aggregator.flush()
+
+            print(f'{market.name} {day.date()}: {candle_cnt} candles built')
+            day += timedelta(days=1)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from common.utils import current_ist_timestamp
+from price_app.partitions import maintain_partitions, default_partitions_ahead_days, default_retention_days
+from price_app.tick_archive import TickArchive
+
+
+# Adds the day partitions of the tick tables for the coming days and, under a retention
+# policy, drops the old ones (archiving them to the columnar tick archive first, by default). e.g.
+#   python manage.py manage_partitions --ahead-days 7 --retention-days 180
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead-days', type=int, default=default_partitions_ahead_days)
+        parser.add_argument('--retention-days', type=int, default=default_retention_days,
+                            help='days of ticks kept in mysql, all of them if not given')
+        parser.add_argument('--no-archive', action='store_true',
+                            help='drop old partitions without archiving them first')
+
+    def handle(self, *args, **options):
+        maintain_partitions(
+            current_ist_timestamp().date(),
+            ahead_days=options['ahead_days'],
+            retention_days=options['retention_days'],
+            archive=None if options['no_archive'] else TickArchive(),
+        )
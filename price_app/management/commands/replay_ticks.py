@@ -0,0 +1,41 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from common.constants import IST_timezone
+from stock_data_fetch.tick_replay import db_tick_batches, random_walk_tick_batches, run_replay, replay_sinks
+
+
+# Load tests the price fetch pipeline offline, by replaying stored or random walk ticks
+# through a fake ticker. e.g.
+#   python manage.py replay_ticks random --ticks 100000 --speed max
+#   python manage.py replay_ticks db --from "2024-09-20 09:15" --to "2024-09-20 15:30" --speed 10 --sink rollback
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('source', choices=['db', 'random'])
+        parser.add_argument('--from', dest='from_timestamp', help='YYYY-MM-DD HH:MM in IST, for db source')
+        parser.add_argument('--to', dest='to_timestamp', help='YYYY-MM-DD HH:MM in IST, for db source')
+        parser.add_argument('--ticks', type=int, default=100000, help='number of ticks, for random source')
+        parser.add_argument('--interval-ms', type=int, default=250, help='gap between ticks, for random source')
+        parser.add_argument('--speed', default='max', help="speed multiplier like 1 or 10, or 'max'")
+        parser.add_argument('--sink', default='null', choices=replay_sinks)
+
+    def handle(self, *args, **options):
+        speed = None if options['speed'] == 'max' else float(options['speed'])
+
+        if options['source'] == 'db':
+            if options['from_timestamp'] is None or options['to_timestamp'] is None:
+                raise Exception('--from and --to are required for db source')
+
+            tick_batches = db_tick_batches(
+                IST_timezone.localize(datetime.strptime(options['from_timestamp'], '%Y-%m-%d %H:%M')),
+                IST_timezone.localize(datetime.strptime(options['to_timestamp'], '%Y-%m-%d %H:%M')),
+            )
+        else:
+            tick_batches = random_walk_tick_batches(
+                options['ticks'],
+                IST_timezone.localize(datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)),
+                interval_in_ms=options['interval_ms'],
+            )
+
+        stats = run_replay(tick_batches, speed, options['sink'])
+
+        print(stats.report())
@@ -0,0 +1,34 @@
+# Generated by Django 4.0 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('price_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Candle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('instrument_token', models.BigIntegerField()),
+                ('resolution_in_sec', models.IntegerField()),
+                ('start_timestamp', models.DateTimeField()),
+                ('open', models.FloatField()),
+                ('high', models.FloatField()),
+                ('low', models.FloatField()),
+                ('close', models.FloatField()),
+                ('tick_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'candle',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='candle',
+            constraint=models.UniqueConstraint(fields=('instrument_token', 'resolution_in_sec', 'start_timestamp'), name='candle_instrument_resolution_start'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+from django.db import migrations, models
+
+price_tables = {
+    'NiftyPrice': 'nifty_price',
+    'BankNiftyPrice': 'bank_nifty_price',
+}
+partitions_ahead_days = 7
+
+
+def partition_definition(day: date) -> str:
+    return f"PARTITION p{day.strftime('%Y%m%d')} VALUES LESS THAN (TO_DAYS('{day + timedelta(days=1)}'))"
+
+
+def timestamp_field(db_index: bool) -> models.DateTimeField:
+    field = models.DateTimeField(db_index=db_index)
+    field.set_attributes_from_name('timestamp')
+    return field
+
+
+# On mysql the primary key becomes (timestamp, id), so that rows are clustered by time, and
+# the table is RANGE partitioned by TO_DAYS(timestamp): one partition per day that has ticks
+# and for the coming days, plus 'p_future'. The separate timestamp index is then redundant.
+# NOTE: this rebuilds the tables, which takes a while for months of ticks
+def partition_price_tables(apps, schema_editor):
+    for model_name, table in price_tables.items():
+        model = apps.get_model('price_app', model_name)
+        schema_editor.alter_field(model, timestamp_field(db_index=True), timestamp_field(db_index=False))
+
+        if schema_editor.connection.vendor != 'mysql':
+            continue
+
+        schema_editor.execute(
+            f'ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (timestamp, id), ADD KEY {table}_id (id)'
+        )
+
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'SELECT DISTINCT DATE(timestamp) FROM {table} ORDER BY 1')
+            days = [row[0] for row in cursor.fetchall()]
+
+        day = date.today()
+        while day <= date.today() + timedelta(days=partitions_ahead_days):
+            if len(days) == 0 or day > days[-1]:
+                days.append(day)
+            day += timedelta(days=1)
+
+        definitions = [partition_definition(day) for day in days] + \
+                      ['PARTITION p_future VALUES LESS THAN MAXVALUE']
+        schema_editor.execute(
+            f'ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS(timestamp)) ({", ".join(definitions)})'
+        )
+
+
+def unpartition_price_tables(apps, schema_editor):
+    for model_name, table in price_tables.items():
+        model = apps.get_model('price_app', model_name)
+
+        if schema_editor.connection.vendor == 'mysql':
+            schema_editor.execute(f'ALTER TABLE {table} REMOVE PARTITIONING')
+            schema_editor.execute(
+                f'ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id), DROP KEY {table}_id'
+            )
+
+        schema_editor.alter_field(model, timestamp_field(db_index=False), timestamp_field(db_index=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('price_app', '0002_candle'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(partition_price_tables, unpartition_price_tables),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='bankniftyprice',
+                    name='timestamp',
+                    field=models.DateTimeField(),
+                ),
+                migrations.AlterField(
+                    model_name='niftyprice',
+                    name='timestamp',
+                    field=models.DateTimeField(),
+                ),
+            ],
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
 
 
+# on mysql the tables are partitioned by day, with (timestamp, id) as primary key,
+# see migration 0003 and price_app/partitions.py
 class Price(models.Model):
-    timestamp = models.DateTimeField(null=False, db_index=True)
+    timestamp = models.DateTimeField(null=False)
     tick_price = models.FloatField(null=False, default=0)
 
     class Meta:
@@ -20,3 +22,28 @@ class NiftyPrice(Price):
 class BankNiftyPrice(Price):
     class Meta:
         db_table = 'bank_nifty_price'
+
+
+# OHLC rollups of ticks, kept up to date by the price fetch process as ticks arrive
+class Candle(models.Model):
+    instrument_token = models.BigIntegerField(null=False)
+    resolution_in_sec = models.IntegerField(null=False)
+    start_timestamp = models.DateTimeField(null=False)
+    open = models.FloatField(null=False)
+    high = models.FloatField(null=False)
+    low = models.FloatField(null=False)
+    close = models.FloatField(null=False)
+    tick_count = models.IntegerField(null=False, default=0)
+
+    class Meta:
+        db_table = 'candle'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['instrument_token', 'resolution_in_sec', 'start_timestamp'],
+                name='candle_instrument_resolution_start',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.instrument_token} [{self.resolution_in_sec}s] {self.start_timestamp}: " \
+               f"O {self.open} H {self.high} L {self.low} C {self.close}"
@@ -0,0 +1,110 @@
+from datetime import date, datetime, timedelta
+from typing import List, Tuple
+from django.conf import settings
+from django.db import connection
+from price_app.tick_archive import TickArchive, price_model_of
+from stock_data_fetch.enums import MarketType
+
+# The tick tables are RANGE partitioned by TO_DAYS(timestamp), one partition per day, plus a
+# catch all 'p_future' partition (see migration 0003). Timestamps are stored in UTC, and a
+# trading session (09:15 - 15:30 IST) always falls within a single UTC day
+future_partition_name = 'p_future'
+partition_date_format = 'p%Y%m%d'
+
+default_partitions_ahead_days = getattr(settings, 'TICK_PARTITIONS_AHEAD_DAYS', 7)
+default_retention_days = getattr(settings, 'TICK_RETENTION_DAYS', None)  # None keeps every day
+
+
+def partition_name(day: date) -> str:
+    return day.strftime(partition_date_format)
+
+
+def partition_definition(day: date) -> str:
+    return f"PARTITION {partition_name(day)} VALUES LESS THAN (TO_DAYS('{day + timedelta(days=1)}'))"
+
+
+def day_partitions(table: str) -> List[Tuple[str, date]]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT PARTITION_NAME FROM information_schema.PARTITIONS '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL '
+            'ORDER BY PARTITION_ORDINAL_POSITION',
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    return [(name, datetime.strptime(name, partition_date_format).date())
+            for name in names if name != future_partition_name]
+
+
+def price_table_of(market: MarketType) -> str:
+    return price_model_of(market)._meta.db_table
+
+
+# splits new day partitions off 'p_future', which is instant as long as 'p_future' is empty
+def add_partitions_until(market: MarketType, last_day: date) -> List[str]:
+    table = price_table_of(market)
+    partitions = day_partitions(table)
+    if len(partitions) == 0:
+        raise Exception(f'{table} is not partitioned, run the migrations first')
+
+    day = partitions[-1][1] + timedelta(days=1)
+    new_days = []
+    while day <= last_day:
+        new_days.append(day)
+        day += timedelta(days=1)
+
+    if len(new_days) == 0:
+        return []
+
+    definitions = [partition_definition(day) for day in new_days] + \
+                  [f'PARTITION {future_partition_name} VALUES LESS THAN MAXVALUE']
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {table} REORGANIZE PARTITION {future_partition_name} '
+                       f'INTO ({", ".join(definitions)})')
+
+    return [partition_name(day) for day in new_days]
+
+
+# drops the day partitions older than 'first_day_to_keep'. With 'archive', a day is first
+# written to the columnar tick archive (if not there already) and is kept if that fails
+def drop_partitions_before(market: MarketType, first_day_to_keep: date, archive: TickArchive = None) -> List[str]:
+    table = price_table_of(market)
+    dropped = []
+
+    for name, day in day_partitions(table):
+        if day >= first_day_to_keep:
+            break
+
+        if archive is not None and not archive.has_day(market, day):
+            try:
+                archive.archive_day(market, day)
+            except Exception as e:
+                print(f'{table}: archiving {day} failed, keeping partition {name}: {e}')
+                continue
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {table} DROP PARTITION {name}')
+        dropped.append(name)
+
+    return dropped
+
+
+# called before each session by the price fetch process and by the manage_partitions command
+def maintain_partitions(
+        today: date,
+        ahead_days: int = default_partitions_ahead_days,
+        retention_days: int = default_retention_days,
+        archive: TickArchive = None,
+):
+    if connection.vendor != 'mysql':
+        print(f'tick table partitions are only maintained on mysql, not on {connection.vendor}')
+        return
+
+    for market in MarketType:
+        added = add_partitions_until(market, today + timedelta(days=ahead_days))
+        print(f'{price_table_of(market)}: partitions added: {added}')
+
+        if retention_days is not None:
+            dropped = drop_partitions_before(market, today - timedelta(days=retention_days), archive)
+            print(f'{price_table_of(market)}: partitions dropped: {dropped}')
@@ -0,0 +1,98 @@
+import json
+import struct
+from typing import Iterator, List, Tuple
+import numpy as np
+from django import http
+from price_app.classes import PriceData
+from price_app.price_frame import PriceFrame
+
+# Response formats of GET /api/price, picked with the 'format' query param, or with
+# 'Accept: application/octet-stream' for 'binary':
+# - 'rows': the original JSON, one object per tick with dt / tm strings (price_data_to_dict)
+# - 'columns': JSON with one array per field, times as epoch ms
+# - 'binary': a little endian uint32 header length, the JSON header
+#   {"market_name", "length", "fields"} padded with spaces so that the arrays start on
+#   8 bytes, then one float64 array of 'length' values per field (epoch ms included, which
+#   float64 holds exactly). In the browser: new Float64Array(buffer, offset, length)
+# 'columns' and 'binary' are streamed, a chunk per field as it is encoded
+price_formats = ['rows', 'columns', 'binary']
+binary_content_type = 'application/octet-stream'
+
+# rounded to 2 decimals in the JSON formats, as in price_data_to_dict
+rounded_fields = [
+    'smooth_price', 'smooth_price_ema', 'slope', 'smooth_slope', 'smooth_slope_ema',
+    'momentum', 'smooth_momentum', 'smooth_momentum_ema', 'momentum_rate',
+]
+
+
+def negotiate_price_format(request: http.HttpRequest) -> str:
+    price_format = request.GET.get('format')
+    if price_format is None:
+        accept = request.headers.get('Accept', '')
+        price_format = 'binary' if binary_content_type in accept else 'rows'
+
+    if price_format not in price_formats:
+        raise Exception(f'invalid format: {price_format}, must be one of {price_formats}')
+
+    return price_format
+
+
+def price_fields(price_frame: PriceFrame) -> List[str]:
+    return ['epoch_ms'] + list(price_frame.columns.keys())
+
+
+def price_field_values(price_frame: PriceFrame, field: str) -> np.ndarray:
+    if field == 'epoch_ms':
+        return price_frame.epoch_ms
+
+    return price_frame.column(field)
+
+
+def iter_price_columns_json(price_data: PriceData) -> Iterator[str]:
+    price_frame: PriceFrame = price_data['price_list']
+
+    yield '{"market_name": %s, "length": %d, "columns": {' % (
+        json.dumps(price_data['market_name'].value), len(price_frame))
+
+    for i, field in enumerate(price_fields(price_frame)):
+        values = price_field_values(price_frame, field)
+        if field in rounded_fields:
+            values = np.round(values, 2)
+
+        yield (', ' if i > 0 else '') + json.dumps(field) + ': ' + json.dumps(values.tolist())
+
+    yield '}}'
+
+
+def binary_header(price_data: PriceData) -> bytes:
+    price_frame: PriceFrame = price_data['price_list']
+    header = json.dumps({
+        'market_name': price_data['market_name'].value,
+        'length': len(price_frame),
+        'fields': price_fields(price_frame),
+    }).encode()
+    header += b' ' * (-(4 + len(header)) % 8)
+
+    return struct.pack('<I', len(header)) + header
+
+
+def iter_price_binary(price_data: PriceData) -> Iterator[bytes]:
+    price_frame: PriceFrame = price_data['price_list']
+
+    yield binary_header(price_data)
+    for field in price_fields(price_frame):
+        yield price_field_values(price_frame, field).astype('<f8').tobytes()
+
+
+# inverse of iter_price_binary, e.g. for python clients: (market name, {field: float64 array})
+def decode_price_binary(payload: bytes) -> Tuple[str, dict]:
+    header_length, = struct.unpack_from('<I', payload)
+    header = json.loads(payload[4:4 + header_length])
+
+    columns = {}
+    offset = 4 + header_length
+    for field in header['fields']:
+        columns[field] = np.frombuffer(payload, dtype='<f8', count=header['length'], offset=offset)
+        offset += 8 * header['length']
+
+    return header['market_name'], columns
@@ -0,0 +1,160 @@
+from datetime import date, time, timedelta
+from typing import Dict, Iterator, List, Union
+import numpy as np
+
+ist_offset_in_ms = (5 * 60 + 30) * 60 * 1000
+ms_in_day = 24 * 60 * 60 * 1000
+epoch_date = date(1970, 1, 1)
+
+
+def ist_date_of(epoch_ms: int) -> date:
+    return epoch_date + timedelta(days=(epoch_ms + ist_offset_in_ms) // ms_in_day)
+
+
+# milliseconds since midnight IST, of every epoch ms
+def ist_ms_of_day(epoch_ms: np.ndarray) -> np.ndarray:
+    return (epoch_ms + ist_offset_in_ms) % ms_in_day
+
+
+def ist_time_of(epoch_ms: int) -> time:
+    ms_of_day = (epoch_ms + ist_offset_in_ms) % ms_in_day
+    return time(
+        ms_of_day // 3600000,
+        ms_of_day // 60000 % 60,
+        ms_of_day // 1000 % 60,
+        ms_of_day % 1000 * 1000,
+    )
+
+
+# One row of a PriceFrame, read like a PriceDataPerTick / PriceDataPerCandle dict:
+# row['tm'], row.get('smooth_price') ... 'dt' and 'tm' are worked out from the epoch time
+class PriceRow:
+    __slots__ = ('_frame', '_i')
+
+    def __init__(self, frame: 'PriceFrame', i: int):
+        self._frame = frame
+        self._i = i
+
+    def __getitem__(self, key: str):
+        return self._frame.values(key)[self._i]
+
+    def __setitem__(self, key: str, value):
+        self._frame.columns[key][self._i] = value
+        self._frame.drop_values(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in ('dt', 'tm') or key in self._frame.columns
+
+    def get(self, key: str, default=None):
+        return self[key] if key in self else default
+
+    def keys(self) -> List[str]:
+        return ['dt', 'tm'] + list(self._frame.columns.keys())
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self.keys()}
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+# Columnar price list: an int64 epoch ms time column plus one float64 array per field
+# (tick_price, open/high/lo/close of candles, indicators). It stands in for the list of
+# per tick dicts in PriceData['price_list']: indexing gives a PriceRow view, slicing gives
+# a PriceFrame viewing the same arrays. Vectorised code should use the arrays of column(),
+# loops going tick by tick are fastest on the python lists of values(), built once per field
+class PriceFrame:
+    def __init__(self, epoch_ms: np.ndarray, columns: Dict[str, np.ndarray] = None):
+        self.epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+        self.columns: Dict[str, np.ndarray] = {}
+        self._values: Dict[str, list] = {}
+        for name, values in (columns or {}).items():
+            self.set_column(name, values)
+
+    @classmethod
+    def from_ticks(cls, timestamps: np.ndarray, prices: np.ndarray) -> 'PriceFrame':
+        return PriceFrame(timestamps, {'tick_price': prices})
+
+    # frames one after the other in time, e.g. days. Empty frames are skipped,
+    # the others must have the same columns
+    @classmethod
+    def concatenate(cls, frames: List['PriceFrame']) -> 'PriceFrame':
+        frames = [frame for frame in frames if len(frame) > 0]
+        if len(frames) == 0:
+            return PriceFrame(np.empty(0, dtype=np.int64))
+        if len(frames) == 1:
+            return frames[0]
+
+        names = list(frames[0].columns.keys())
+        for frame in frames[1:]:
+            if set(frame.columns.keys()) != set(names):
+                raise Exception(f'price frames have different columns: {names}, {list(frame.columns.keys())}')
+
+        return PriceFrame(
+            np.concatenate([frame.epoch_ms for frame in frames]),
+            {name: np.concatenate([frame.columns[name] for frame in frames]) for name in names},
+        )
+
+    def __len__(self) -> int:
+        return len(self.epoch_ms)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[PriceRow, 'PriceFrame']:
+        if isinstance(index, slice):
+            return PriceFrame(
+                self.epoch_ms[index],
+                {name: values[index] for name, values in self.columns.items()},
+            )
+
+        n = len(self.epoch_ms)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError(f'price frame index out of range: {index}')
+
+        return PriceRow(self, index)
+
+    # new frame of the rows at 'indices'
+    def take(self, indices: np.ndarray) -> 'PriceFrame':
+        return PriceFrame(
+            self.epoch_ms[indices],
+            {name: values[indices] for name, values in self.columns.items()},
+        )
+
+    def __iter__(self) -> Iterator[PriceRow]:
+        for i in range(len(self.epoch_ms)):
+            yield PriceRow(self, i)
+
+    def has_column(self, name: str) -> bool:
+        return name in self.columns
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def set_column(self, name: str, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) != len(self.epoch_ms):
+            raise Exception(f'column {name} has {len(values)} values, price frame has {len(self.epoch_ms)} rows')
+
+        self.columns[name] = values
+        self.drop_values(name)
+
+    # python list of a field: floats, or date / time objects (in IST) for 'dt' / 'tm'
+    def values(self, name: str) -> list:
+        values = self._values.get(name)
+        if values is None:
+            if name == 'tm':
+                values = [ist_time_of(epoch_ms) for epoch_ms in self.epoch_ms.tolist()]
+            elif name == 'dt':
+                values = [ist_date_of(epoch_ms) for epoch_ms in self.epoch_ms.tolist()]
+            else:
+                values = self.columns[name].tolist()
+
+            self._values[name] = values
+
+        return values
+
+    def drop_values(self, name: str):
+        self._values.pop(name, None)
+
+    def to_list(self) -> List[dict]:
+        return [row.to_dict() for row in self]
@@ -195,6 +195,7 @@ def get_market_moves_for_day(
         config.smooth_slope_ema_period,
         config.smooth_momentum_period,
         config.smooth_momentum_ema_period,
+        config.smooth_momentum_averaging_method,
     )
 
     price_list: List[PriceDataPerTick] = price_data['price_list']
@@ -0,0 +1,135 @@
+import os
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from common.constants import IST_timezone, instrument_tokens_by_market, subscribed_instruments
+from common.utils import to_epoch_ms
+from stock_data_fetch.enums import MarketType
+
+default_tick_archive_dir = Path(settings.BASE_DIR) / 'tick_archive'
+
+timestamps_file_name = 'timestamps.npy'  # int64, epoch ms, ascending
+prices_file_name = 'prices.npy'  # float64
+
+date_format = '%Y-%m-%d'
+
+
+def day_start(day: date) -> datetime:
+    return IST_timezone.localize(datetime.combine(day, time.min))
+
+
+def price_model_of(market: MarketType):
+    return apps.get_model(subscribed_instruments[instrument_tokens_by_market[market.name]])
+
+
+def _save_atomically(path: Path, array: np.ndarray):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+
+
+# Columnar copy of the stored ticks, one directory per (market, IST trading day) holding a
+# timestamps.npy and a prices.npy array. Files are memory mapped on read, so a range of
+# ticks comes back as numpy arrays without building a model object per tick
+class TickArchive:
+    def __init__(self, archive_dir: Path = default_tick_archive_dir):
+        self.archive_dir = Path(archive_dir)
+        self._mapped_days: Dict[Tuple[MarketType, date], Tuple[np.ndarray, np.ndarray]] = {}
+
+    def day_dir(self, market: MarketType, day: date) -> Path:
+        return self.archive_dir / market.name / day.strftime(date_format)
+
+    def has_day(self, market: MarketType, day: date) -> bool:
+        return (self.day_dir(market, day) / prices_file_name).exists()
+
+    def days(self, market: MarketType) -> List[date]:
+        market_dir = self.archive_dir / market.name
+        if not market_dir.exists():
+            return []
+
+        return sorted(
+            datetime.strptime(day_dir.name, date_format).date()
+            for day_dir in market_dir.iterdir()
+            if (day_dir / prices_file_name).exists()
+        )
+
+    # returns the number of ticks archived, days without ticks (holidays) are not archived
+    def archive_day(self, market: MarketType, day: date, overwrite: bool = False) -> int:
+        if self.has_day(market, day) and not overwrite:
+            raise Exception(f'{market.name} {day} is already archived')
+
+        rows = price_model_of(market).objects.filter(
+            timestamp__gte=day_start(day),
+            timestamp__lt=day_start(day + timedelta(days=1)),
+        ).order_by('timestamp').values_list('timestamp', 'tick_price')
+
+        timestamps = []
+        prices = []
+        for timestamp, tick_price in rows.iterator():
+            timestamps.append(to_epoch_ms(timestamp))
+            prices.append(tick_price)
+
+        if len(timestamps) == 0:
+            return 0
+
+        day_dir = self.day_dir(market, day)
+        day_dir.mkdir(parents=True, exist_ok=True)
+
+        # timestamps first: a day counts as archived once its prices file is there
+        _save_atomically(day_dir / timestamps_file_name, np.array(timestamps, dtype=np.int64))
+        _save_atomically(day_dir / prices_file_name, np.array(prices, dtype=np.float64))
+        self._mapped_days.pop((market, day), None)
+
+        return len(timestamps)
+
+    def load_day(self, market: MarketType, day: date) -> Tuple[np.ndarray, np.ndarray]:
+        key = (market, day)
+        if key not in self._mapped_days:
+            day_dir = self.day_dir(market, day)
+            self._mapped_days[key] = (
+                np.load(day_dir / timestamps_file_name, mmap_mode='r'),
+                np.load(day_dir / prices_file_name, mmap_mode='r'),
+            )
+
+        return self._mapped_days[key]
+
+    # ticks in [start_timestamp, end_timestamp] of the archived days, as (epoch ms, price) arrays.
+    # Within a single day the arrays are read only views of the memory mapped files
+    def range(
+            self,
+            market: MarketType,
+            start_timestamp: datetime,
+            end_timestamp: datetime,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        start_epoch_ms = to_epoch_ms(start_timestamp)
+        end_epoch_ms = to_epoch_ms(end_timestamp)
+
+        timestamp_parts = []
+        price_parts = []
+
+        day = start_timestamp.astimezone(IST_timezone).date()
+        last_day = end_timestamp.astimezone(IST_timezone).date()
+        while day <= last_day:
+            if self.has_day(market, day):
+                timestamps, prices = self.load_day(market, day)
+                lo = np.searchsorted(timestamps, start_epoch_ms, side='left')
+                hi = np.searchsorted(timestamps, end_epoch_ms, side='right')
+                if hi > lo:
+                    timestamp_parts.append(timestamps[lo:hi])
+                    price_parts.append(prices[lo:hi])
+
+            day += timedelta(days=1)
+
+        if len(timestamp_parts) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        if len(timestamp_parts) == 1:
+            return timestamp_parts[0], price_parts[0]
+
+        return np.concatenate(timestamp_parts), np.concatenate(price_parts)
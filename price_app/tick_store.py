@@ -0,0 +1,149 @@
+import itertools
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from common.constants import IST_timezone
+from common.utils import to_epoch_ms
+from price_app.tick_archive import TickArchive, day_start, price_model_of
+from price_app.timing import stage
+from stock_data_fetch.enums import MarketType
+
+Ticks = Tuple[np.ndarray, np.ndarray]  # (int64 epoch ms, float64 price), in time order
+
+
+def empty_ticks() -> Ticks:
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+
+def concatenate_ticks(parts: List[Ticks]) -> Ticks:
+    parts = [part for part in parts if len(part[0]) > 0]
+    if len(parts) == 0:
+        return empty_ticks()
+    if len(parts) == 1:
+        return parts[0]
+
+    return np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts])
+
+
+# naive timestamps are taken in the django TIME_ZONE, the same as the ORM does
+def as_aware(timestamp: datetime) -> datetime:
+    return timezone.make_aware(timestamp) if timezone.is_naive(timestamp) else timestamp
+
+
+# Where the ticks of a market are read from. 'range' returns the ticks in
+# [start_timestamp, end_timestamp], both ends inclusive
+class TickStore(ABC):
+    @abstractmethod
+    def range(self, market: MarketType, start_timestamp: datetime, end_timestamp: datetime) -> Ticks:
+        pass
+
+
+# price tables in the django DB (MySQL)
+class MySQLTickStore(TickStore):
+    def range(self, market: MarketType, start_timestamp: datetime, end_timestamp: datetime) -> Ticks:
+        rows = price_model_of(market).objects.filter(
+            timestamp__gte=as_aware(start_timestamp),
+            timestamp__lte=as_aware(end_timestamp),
+        ).order_by('timestamp', 'id').values_list('timestamp', 'tick_price')
+
+        # rows are streamed: only the query, up to its first row, is timed on its own
+        rows = rows.iterator()
+        with stage('ticks.sql'):
+            first_row = next(rows, None)
+
+        timestamps = []
+        prices = []
+        if first_row is not None:
+            for timestamp, tick_price in itertools.chain([first_row], rows):
+                timestamps.append(to_epoch_ms(timestamp))
+                prices.append(tick_price)
+
+        return np.array(timestamps, dtype=np.int64), np.array(prices, dtype=np.float64)
+
+
+# columnar day files of price_app/tick_archive.py. Days not archived (yet) are read from 'fallback'
+class ArchiveTickStore(TickStore):
+    def __init__(self, archive: TickArchive = None, fallback: TickStore = None):
+        self.archive = archive if archive is not None else TickArchive()
+        self.fallback = fallback if fallback is not None else MySQLTickStore()
+
+    def range(self, market: MarketType, start_timestamp: datetime, end_timestamp: datetime) -> Ticks:
+        start_timestamp = as_aware(start_timestamp)
+        end_timestamp = as_aware(end_timestamp)
+
+        parts: List[Ticks] = []
+        fallback_start = None  # start of the current run of days not archived
+
+        day = start_timestamp.astimezone(IST_timezone).date()
+        last_day = end_timestamp.astimezone(IST_timezone).date()
+        while day <= last_day:
+            part_start = max(start_timestamp, day_start(day))
+            part_end = min(end_timestamp, day_start(day + timedelta(days=1)) - timedelta(microseconds=1))
+
+            if self.archive.has_day(market, day):
+                if fallback_start is not None:
+                    parts.append(self.fallback.range(market, fallback_start, day_start(day) - timedelta(microseconds=1)))
+                    fallback_start = None
+
+                parts.append(self.archive.range(market, part_start, part_end))
+            elif fallback_start is None:
+                fallback_start = part_start
+
+            day += timedelta(days=1)
+
+        if fallback_start is not None:
+            parts.append(self.fallback.range(market, fallback_start, end_timestamp))
+
+        return concatenate_ticks(parts)
+
+
+# ticks held in memory, e.g. for tests or for data loaded once by a long backtest
+class InMemoryTickStore(TickStore):
+    def __init__(self):
+        self._ticks: Dict[MarketType, Ticks] = {}
+
+    # ticks may come in any order, they are kept sorted by time
+    def add(self, market: MarketType, timestamps: np.ndarray, prices: np.ndarray):
+        timestamps, prices = concatenate_ticks([
+            self._ticks.get(market, empty_ticks()),
+            (np.asarray(timestamps, dtype=np.int64), np.asarray(prices, dtype=np.float64)),
+        ])
+        order = np.argsort(timestamps, kind='stable')
+        self._ticks[market] = timestamps[order], prices[order]
+
+    def range(self, market: MarketType, start_timestamp: datetime, end_timestamp: datetime) -> Ticks:
+        timestamps, prices = self._ticks.get(market, empty_ticks())
+        lo = np.searchsorted(timestamps, to_epoch_ms(as_aware(start_timestamp)), side='left')
+        hi = np.searchsorted(timestamps, to_epoch_ms(as_aware(end_timestamp)), side='right')
+
+        return timestamps[lo:hi], prices[lo:hi]
+
+
+tick_store_backends = {
+    'mysql': MySQLTickStore,
+    'archive': ArchiveTickStore,
+    'memory': InMemoryTickStore,
+}
+
+_tick_store: TickStore = None
+
+
+# the store named by settings.TICK_STORE, unless replaced with set_tick_store()
+def get_tick_store() -> TickStore:
+    global _tick_store
+    if _tick_store is None:
+        backend = getattr(settings, 'TICK_STORE', 'mysql')
+        if backend not in tick_store_backends:
+            raise Exception(f'invalid TICK_STORE: {backend}, must be one of {list(tick_store_backends)}')
+
+        _tick_store = tick_store_backends[backend]()
+
+    return _tick_store
+
+
+def set_tick_store(tick_store: TickStore):
+    global _tick_store
+    _tick_store = tick_store
@@ -0,0 +1,162 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Iterator, Optional, Tuple
+from django import http
+from django.conf import settings
+
+# Time spent per stage of the price api requests. A view decorated with timed_view times the
+# stages run while it handles the request ('with stage(name):' anywhere down the call chain)
+# and sends them in the Server-Timing response header, e.g.
+#   Server-Timing: ticks;dur=182.4, indicators;dur=35.1, downsample;dur=2.0, encode;dur=9.8, total;dur=231.0
+# and adds them to histograms per (endpoint, stage), served by GET /api/metrics. A stage run
+# several times in a request (one per day, per chart of a batch) is summed. The body of the
+# streamed formats is encoded after the headers are sent: their 'encode' stage (and the total
+# including it) only make it to the histograms.
+# Outside a timed request, or with PRICE_API_TIMING = False in settings, stage() does nothing
+timing_enabled = getattr(settings, 'PRICE_API_TIMING', True)
+
+# upper bounds of the histogram buckets, the last bucket takes the rest
+histogram_bounds_in_ms = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class StageTimings:
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.durations: Dict[str, float] = {}  # stage -> seconds, in the order first run
+        self.lock = threading.Lock()  # stages of batch charts run in worker threads
+
+    def add(self, name: str, seconds: float):
+        with self.lock:
+            self.durations[name] = self.durations.get(name, 0) + seconds
+
+    def server_timing(self) -> str:
+        durations = dict(self.durations, total=time.perf_counter() - self.start)
+        return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in durations.items())
+
+
+_current_timings: ContextVar[Optional[StageTimings]] = ContextVar('stage_timings', default=None)
+
+
+@contextmanager
+def stage(name: str):
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(histogram_bounds_in_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(histogram_bounds_in_ms, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    # buckets are cumulative: the number of observations <= each bound
+    def to_dict(self) -> dict:
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(histogram_bounds_in_ms + ['inf'], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+
+        return {
+            'count': self.count,
+            'sum_ms': round(self.sum_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'buckets_ms': buckets,
+        }
+
+
+class TimingMetrics:
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings: StageTimings):
+        total = time.perf_counter() - timings.start
+        with timings.lock:
+            durations = dict(timings.durations, total=total)
+
+        with self._lock:
+            for name, seconds in durations.items():
+                histogram = self._histograms.get((timings.endpoint, name))
+                if histogram is None:
+                    histogram = self._histograms[(timings.endpoint, name)] = Histogram()
+                histogram.observe(seconds * 1000)
+
+    # {endpoint: {stage: histogram}}
+    def to_dict(self) -> dict:
+        metrics = {}
+        with self._lock:
+            for (endpoint, name), histogram in self._histograms.items():
+                metrics.setdefault(endpoint, {})[name] = histogram.to_dict()
+
+        return metrics
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+timing_metrics = TimingMetrics()
+
+
+# the streamed body, with its encoding timed. The request is recorded once it is sent
+# (or the client went away)
+def iter_timed_content(timings: StageTimings, content: Iterator) -> Iterator:
+    iterator = iter(content)
+    try:
+        while True:
+            start = time.perf_counter()
+            chunk = next(iterator, None)
+            timings.add('encode', time.perf_counter() - start)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        timing_metrics.record(timings)
+
+
+def timed_view(endpoint: str):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request: http.HttpRequest, *args, **kwargs):
+            if not timing_enabled:
+                return view(request, *args, **kwargs)
+
+            timings = StageTimings(endpoint)
+            token = _current_timings.set(timings)
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                _current_timings.reset(token)
+
+            response['Server-Timing'] = timings.server_timing()
+            if response.streaming:
+                response.streaming_content = iter_timed_content(timings, response.streaming_content)
+            else:
+                timing_metrics.record(timings)
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from price_app.handlers import fetch_price
+from price_app.handlers import fetch_metrics, fetch_price, fetch_price_batch, publish_ticks
 
 urlpatterns = [
     path(
@@ -8,4 +8,19 @@ urlpatterns = [
         fetch_price,
         name='fetch-price',
     ),
+    path(
+        'price/batch',
+        fetch_price_batch,
+        name='fetch-price-batch',
+    ),
+    path(
+        'price/publish',
+        publish_ticks,
+        name='publish-ticks',
+    ),
+    path(
+        'metrics',
+        fetch_metrics,
+        name='fetch-metrics',
+    ),
 ]
@@ -0,0 +1,4 @@
+python manage.py makemigrations
+python manage.py migrate
+# ASGI server, needed for the live price stream (/api/price/stream)
+uvicorn stock_data_fetch.asgi:application --port 8888
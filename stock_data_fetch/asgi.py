@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stock_data_fetch.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from price_app.live_stream import price_stream_app, price_stream_path  # noqa: E402, needs django set up
+
+
+# the live price stream (Server-Sent Events) is served outside of django, which can't
+# stream asynchronously before 4.2; every other request goes to django
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == price_stream_path:
+        return await price_stream_app(scope, receive, send)
+
+    return await django_application(scope, receive, send)
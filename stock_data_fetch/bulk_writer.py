@@ -0,0 +1,117 @@
+import queue
+import threading
+import time
+import traceback
+from typing import Callable, List, Optional
+from django.db import models, transaction, connection
+
+default_max_batch_size = 500  # flush as soon as these many rows are buffered
+default_max_wait_in_sec = 1.0  # ... or when the oldest buffered row is this old
+
+_close_signal = object()
+
+
+def bulk_create_models(rows: List[models.Model]):
+    rows_by_model = {}
+    for row in rows:
+        rows_by_model.setdefault(type(row), []).append(row)
+
+    with transaction.atomic():
+        for model, model_rows in rows_by_model.items():
+            model.objects.bulk_create(model_rows)
+
+
+# Buffers rows in memory and hands them over to 'flush_fn' in batches from a
+# dedicated thread, so that the producer (websocket callback) never waits on DB.
+# 'on_flushed', if set, gets the time.monotonic() at which each add() / add_all()
+# of a successfully flushed batch was made, e.g. to measure write latency
+class BulkWriter:
+    def __init__(
+            self,
+            name: str,
+            flush_fn: Callable[[List], None],
+            max_batch_size: int = default_max_batch_size,
+            max_wait_in_sec: float = default_max_wait_in_sec,
+            on_flushed: Optional[Callable[[List[float]], None]] = None,
+    ):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_in_sec = max_wait_in_sec
+        self.on_flushed = on_flushed
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f'bulk-writer-{name}', daemon=True)
+
+    def start(self):
+        print(f'[{self.name}] starting bulk writer ...')
+        self._thread.start()
+        return self
+
+    def add(self, row):
+        self._queue.put_nowait((time.monotonic(), row))
+
+    # a whole batch goes through the queue as one item
+    def add_all(self, rows: List):
+        if len(rows) > 0:
+            self._queue.put_nowait((time.monotonic(), rows))
+
+    def close(self, timeout: float = None):
+        self._queue.put_nowait(_close_signal)
+        self._thread.join(timeout)
+
+        print(f'[{self.name}] bulk writer closed')
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _flush(self, buffer: List, enqueued_ats: List[float]) -> bool:
+        if len(buffer) == 0:
+            return True
+
+        try:
+            self.flush_fn(buffer)
+        except Exception as e:
+            print(f'[{self.name}] bulk writer flush failed for {len(buffer)} rows, will retry: {e}')
+            traceback.print_exc()
+            return False
+
+        if self.on_flushed is not None:
+            self.on_flushed(enqueued_ats)
+
+        return True
+
+    def _run(self):
+        buffer = []
+        enqueued_ats = []
+        deadline = time.monotonic() + self.max_wait_in_sec
+        closed = False
+
+        while not closed:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                if item is _close_signal:
+                    closed = True
+                else:
+                    enqueued_at, row = item
+                    enqueued_ats.append(enqueued_at)
+                    if isinstance(row, list):
+                        buffer.extend(row)
+                    else:
+                        buffer.append(row)
+            except queue.Empty:
+                pass
+
+            if closed or len(buffer) >= self.max_batch_size or time.monotonic() >= deadline:
+                if self._flush(buffer, enqueued_ats):
+                    buffer = []
+                    enqueued_ats = []
+
+                deadline = time.monotonic() + self.max_wait_in_sec
+
+        # final flush at close: one more attempt for whatever failed earlier
+        if not self._flush(buffer, enqueued_ats):
+            print(f'[{self.name}] bulk writer dropped {len(buffer)} rows at close')
+
+        connection.close()
@@ -0,0 +1,93 @@
+from typing import Callable, Dict, List, Tuple
+from common.constants import candle_resolutions_in_sec
+from common.entities import TickRow
+from common.utils import from_epoch_ms
+from price_app.models import Candle
+
+
+def bulk_create_candles(candles: List[Candle]):
+    # a candle already present (e.g. rebuilt after a restart) is left as it is
+    Candle.objects.bulk_create(candles, ignore_conflicts=True)
+
+
+class OpenCandle:
+    __slots__ = ('start_epoch_ms', 'open', 'high', 'low', 'close', 'tick_count')
+
+    def __init__(self, start_epoch_ms: int, price: float):
+        self.start_epoch_ms = start_epoch_ms
+        self.open = price
+        self.high = price
+        self.low = price
+        self.close = price
+        self.tick_count = 1
+
+    def add_tick_price(self, price: float):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.tick_count += 1
+
+    def to_candle(self, instrument_token: int, resolution_in_sec: int) -> Candle:
+        return Candle(
+            instrument_token=instrument_token,
+            resolution_in_sec=resolution_in_sec,
+            start_timestamp=from_epoch_ms(self.start_epoch_ms),
+            open=self.open,
+            high=self.high,
+            low=self.low,
+            close=self.close,
+            tick_count=self.tick_count,
+        )
+
+
+# Streaming OHLC rollup of ticks for every (instrument, resolution). Candles are aligned
+# to multiples of their resolution in epoch time and are handed over to 'on_candles_closed'
+# as soon as the first tick of the next candle arrives.
+# Not thread safe, meant to be fed from one thread only
+class CandleAggregator:
+    def __init__(
+            self,
+            on_candles_closed: Callable[[List[Candle]], None],
+            resolutions_in_sec: List[int] = None,
+    ):
+        self.on_candles_closed = on_candles_closed
+        self.resolutions_in_sec = resolutions_in_sec if resolutions_in_sec is not None \
+            else candle_resolutions_in_sec
+
+        self._open_candles: Dict[Tuple[int, int], OpenCandle] = {}
+        self.late_tick_count = 0
+
+    def add_rows(self, rows: List[TickRow]):
+        closed_candles: List[Candle] = []
+
+        for row in rows:
+            for resolution_in_sec in self.resolutions_in_sec:
+                resolution_in_ms = resolution_in_sec * 1000
+                start_epoch_ms = row.epoch_ms - row.epoch_ms % resolution_in_ms
+                key = (row.instrument_token, resolution_in_sec)
+
+                open_candle = self._open_candles.get(key)
+                if open_candle is None or start_epoch_ms > open_candle.start_epoch_ms:
+                    if open_candle is not None:
+                        closed_candles.append(open_candle.to_candle(row.instrument_token, resolution_in_sec))
+                    self._open_candles[key] = OpenCandle(start_epoch_ms, row.price)
+                elif start_epoch_ms == open_candle.start_epoch_ms:
+                    open_candle.add_tick_price(row.price)
+                else:
+                    self.late_tick_count += 1  # its candle is already closed
+
+        if len(closed_candles) > 0:
+            self.on_candles_closed(closed_candles)
+
+    # closes the candles still open, e.g. at market close
+    def flush(self):
+        closed_candles = [
+            open_candle.to_candle(instrument_token, resolution_in_sec)
+            for (instrument_token, resolution_in_sec), open_candle in self._open_candles.items()
+        ]
+        self._open_candles = {}
+
+        if len(closed_candles) > 0:
+            self.on_candles_closed(closed_candles)
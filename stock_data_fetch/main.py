@@ -1,26 +1,12 @@
-import threading
 import time
 from common.constants import data_fetch_start_time
 from common.kite_client import KiteConnectClient
 from kiteconnect import KiteConnect
 
-from common.utils import now_ist
-from stock_data_fetch.banknifty_price_fetch import start_fetching_banknifty_price_and_inserting_into_db
-from stock_data_fetch.nifty_price_fetch import start_fetching_nifty_price_and_inserting_into_db
-
-
-def async_start_fetching_nifty_price_data(kc: KiteConnect):
-    print('[ASYNC SPAWN] - async_start_fetching_nifty_price_data ...')
-
-    thread = threading.Thread(target=start_fetching_nifty_price_and_inserting_into_db)
-    thread.start()
-
-
-def async_start_fetching_banknifty_price_data(kc: KiteConnect):
-    print('[ASYNC SPAWN] - async_start_fetching_banknifty_price_data ...')
-
-    thread = threading.Thread(target=start_fetching_banknifty_price_and_inserting_into_db)
-    thread.start()
+from common.utils import now_ist, current_ist_timestamp
+from price_app.partitions import maintain_partitions
+from price_app.tick_archive import TickArchive
+from stock_data_fetch.price_fetch import PriceFetchService
 
 
 def main():
@@ -28,9 +14,14 @@ def main():
 
     kc: KiteConnect = KiteConnectClient()
 
+    # partitions for today's ticks must exist before the session starts
+    try:
+        maintain_partitions(current_ist_timestamp().date(), archive=TickArchive())
+    except Exception as e:
+        print(f'[MAIN] : maintaining tick table partitions failed, ticks go to p_future meanwhile: {e}')
+
     while now_ist() < data_fetch_start_time:
         time.sleep(3)
 
-    async_start_fetching_nifty_price_data(kc)
-    time.sleep(0.5)  # sleeping to instantiate web socket without any 'ReactorAlreadyRunning' exception
-    async_start_fetching_banknifty_price_data(kc)
+    # a single websocket connection serves every subscribed instrument
+    PriceFetchService().run()
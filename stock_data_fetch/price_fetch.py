@@ -0,0 +1,121 @@
+import time
+from typing import Dict, List
+from django.apps import apps
+from kiteconnect import KiteTicker
+from common.constants import data_fetch_finish_time, data_fetch_start_time, market_opening_time, \
+    market_closing_time, subscribed_instruments, IST_timezone
+from common.entities import TickerData, TickRow
+from common.kite_client import new_kite_websocket_client
+from common.utils import current_ist_timestamp, now_ist, to_epoch_ms
+from stock_data_fetch.bulk_writer import BulkWriter
+from stock_data_fetch.candle_aggregator import CandleAggregator, bulk_create_candles
+from stock_data_fetch.spill_log import SpillLog, SpillReplayer
+from stock_data_fetch.tick_publisher import TickPublisher
+
+
+# One KiteTicker connection for all the instruments in 'subscribed_instruments'.
+# Every tick is routed by its instrument token to the price model of that instrument.
+# Ticks go: websocket callback -> in memory queue -> local spill log (fsync per batch)
+# -> MySQL (bulk inserts by the spill replayer, which keeps retrying while DB is down).
+# Once spilled, ticks are also rolled up into OHLC candles, written to the 'candle' table,
+# and published to the api server for the live price stream (stock_data_fetch/tick_publisher.py)
+class PriceFetchService:
+    def __init__(
+            self,
+            instruments: Dict[int, str] = None,
+            kws: KiteTicker = None,
+            spill_log: SpillLog = None,
+            tick_publisher: TickPublisher = None,
+    ):
+        instruments = instruments if instruments is not None else subscribed_instruments
+
+        self.price_models: Dict[int, type] = {
+            instrument_token: apps.get_model(model_label)
+            for instrument_token, model_label in instruments.items()
+        }
+        self.kws = kws
+        self.spill_log = spill_log if spill_log is not None else SpillLog()
+        self.price_writer = BulkWriter('PRICE', self.spill_and_aggregate, max_wait_in_sec=0.2)
+        self.spill_replayer = SpillReplayer(self.spill_log, self.price_models)
+        self.candle_writer = BulkWriter('CANDLE', bulk_create_candles)
+        self.candle_aggregator = CandleAggregator(self.candle_writer.add_all)
+        self.tick_publisher = tick_publisher if tick_publisher is not None else TickPublisher()
+
+    @property
+    def instrument_tokens(self) -> List[int]:
+        return list(self.price_models.keys())
+
+    def subscribe_to_instruments(self, ws, response):
+        ws.subscribe(self.instrument_tokens)
+        # full mode is the one in which the feed carries the exchange timestamp of a tick
+        ws.set_mode(ws.MODE_FULL, self.instrument_tokens)
+
+    def close_websocket_connection(self, ws, code, reason):
+        ws.stop()
+
+    def ticks_to_rows(self, ticks: List[TickerData]) -> List[TickRow]:
+        received_at = None
+        rows = []
+
+        for stock_data in ticks:
+            instrument_token = stock_data['instrument_token']
+            if instrument_token not in self.price_models:
+                print(f'ignoring tick of unsubscribed instrument: {instrument_token}')
+                continue
+
+            timestamp = stock_data.get('exchange_timestamp')
+            if timestamp is not None:
+                timestamp = timestamp.astimezone(IST_timezone)  # kiteconnect gives naive local time
+            else:
+                if received_at is None:
+                    received_at = current_ist_timestamp()
+                timestamp = received_at
+
+            rows.append(TickRow(instrument_token, to_epoch_ms(timestamp), stock_data['last_price']))
+
+        return rows
+
+    # runs in the price writer thread. Aggregation only follows a successful append,
+    # so a batch retried by the writer is not counted twice in the candles
+    def spill_and_aggregate(self, rows: List[TickRow]):
+        self.spill_log.append(rows)
+        self.candle_aggregator.add_rows(rows)
+        self.tick_publisher.add_all(rows)
+
+    def queue_ticks(self, ws, ticks: List[TickerData]):
+        self.price_writer.add_all(self.ticks_to_rows(ticks))
+
+    def start(self):
+        if self.kws is None:
+            self.kws = new_kite_websocket_client('ALL INSTRUMENTS')
+
+        self.kws.on_connect = self.subscribe_to_instruments
+        self.kws.on_ticks = self.queue_ticks
+        self.kws.on_close = self.close_websocket_connection
+
+        self.spill_replayer.start()
+        self.candle_writer.start()
+        self.tick_publisher.start()
+        self.price_writer.start()
+        self.kws.connect(threaded=True)
+
+    def stop(self):
+        self.kws.close()
+        self.price_writer.close()  # flushes ticks still buffered at market close
+        self.candle_aggregator.flush()  # closes the candles still open
+        self.candle_writer.close()
+        self.tick_publisher.close()
+        self.spill_replayer.close()
+        self.spill_log.close()
+
+    def run(self):
+        while now_ist() <= min(data_fetch_start_time, market_opening_time):
+            time.sleep(5)
+
+        print(f'starting price async fetching process for {self.instrument_tokens} ........')
+        self.start()
+
+        while now_ist() <= min(data_fetch_finish_time, market_closing_time):
+            time.sleep(1)
+
+        self.stop()
@@ -49,6 +49,28 @@ DATABASES = {
     # }
 }
 
+# where ticks are read from for charts and backtests (price_app/tick_store.py):
+# 'mysql', 'archive' (columnar day files, falling back to mysql for days not archived) or 'memory'
+TICK_STORE = 'archive'
+
+# day partitions of the tick tables (price_app/partitions.py): created this many days ahead,
+# and dropped (after archiving) once older than TICK_RETENTION_DAYS. None keeps every day in mysql
+TICK_PARTITIONS_AHEAD_DAYS = 7
+TICK_RETENTION_DAYS = None
+
+# upper bound of the memory held by the tick arrays cached in price_app/cache.py
+PRICE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# and of the per day price frames with their indicators, cached per indicator settings
+INDICATOR_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# the price fetch process pushes live ticks to the api server for the live price stream
+# (price_app/live_stream.py). None disables it. Only these client addresses may publish
+TICK_PUBLISH_URL = 'http://localhost:8888/api/price/publish'
+TICK_PUBLISH_ALLOWED_ADDRESSES = ['127.0.0.1', '::1']
+
+# per stage timings of the price api: Server-Timing header and histograms on /api/metrics
+PRICE_API_TIMING = True
+
 
 # Application definition
 
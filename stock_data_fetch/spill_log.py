@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.db import connection
+from common.entities import TickRow
+from common.utils import from_epoch_ms
+from stock_data_fetch.bulk_writer import bulk_create_models
+
+default_spill_log_path = Path(settings.BASE_DIR) / 'tick_spill' / 'ticks.log'
+max_line_length = 128  # upper bound, used to size reads
+
+
+# Append-only local file of ticks, one "<instrument_token>,<epoch_ms>,<price>" line per tick.
+# Ticks land here first, and the SpillReplayer moves them to MySQL. How far the replayer
+# has got is kept in a separate offset file, so nothing is lost across a DB or process restart
+class SpillLog:
+    def __init__(self, path: Path = default_spill_log_path):
+        self.path = Path(path)
+        self.offset_path = self.path.with_name(self.path.name + '.offset')
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._drop_partial_last_line()
+        self._file = open(self.path, 'ab')
+
+    def _drop_partial_last_line(self):
+        # a crash in the middle of an append leaves a line without '\n' at the end
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'rb+') as f:
+            content = f.read()
+            if len(content) > 0 and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+                print(f'spill log: dropped partial last line of {self.path}')
+
+    # called from the writer thread, one fsync per batch
+    def append(self, rows: List[TickRow]):
+        lines = ''.join(f'{row.instrument_token},{row.epoch_ms},{row.price!r}\n' for row in rows)
+        self._file.write(lines.encode())
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def read(self, offset: int, max_rows: int) -> Tuple[List[TickRow], int]:
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            content = f.read(max_rows * max_line_length)
+
+        rows: List[TickRow] = []
+        for line in content.splitlines(keepends=True):
+            if not line.endswith(b'\n') or len(rows) == max_rows:
+                break  # not fully written yet / enough for one batch
+
+            offset += len(line)
+            try:
+                instrument_token, epoch_ms, price = line.decode().rstrip('\n').split(',')
+                rows.append(TickRow(int(instrument_token), int(epoch_ms), float(price)))
+            except ValueError:
+                print(f'spill log: skipping malformed line: {line}')
+
+        return rows, offset
+
+    def read_offset(self) -> int:
+        if not self.offset_path.exists():
+            return 0
+
+        return int(self.offset_path.read_text().strip() or 0)
+
+    def commit_offset(self, offset: int):
+        tmp_path = self.offset_path.with_name(self.offset_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, self.offset_path)
+
+    # offset right after the last appended line
+    def end_offset(self) -> int:
+        return self._file.tell()
+
+    def pending_bytes(self) -> int:
+        return self.path.stat().st_size - self.read_offset()
+
+    # once everything is replayed, the log starts afresh
+    def clear(self):
+        self._file.truncate(0)
+        self.commit_offset(0)
+
+    def close(self):
+        self._file.close()
+
+
+# Drains the spill log into MySQL in bulk. While the DB is unreachable it keeps
+# retrying, and the ticks simply pile up in the spill log in the meantime.
+# 'on_replayed', if set, gets the spill log offset up to which rows are in the DB
+class SpillReplayer:
+    def __init__(
+            self,
+            spill_log: SpillLog,
+            price_models: Dict[int, type],
+            max_batch_size: int = 5000,
+            poll_interval_in_sec: float = 0.5,
+            retry_interval_in_sec: float = 2.0,
+            max_retries_at_close: int = 30,
+            write_fn: Callable[[List], None] = bulk_create_models,
+            on_replayed: Optional[Callable[[int], None]] = None,
+    ):
+        self.spill_log = spill_log
+        self.price_models = price_models
+        self.max_batch_size = max_batch_size
+        self.poll_interval_in_sec = poll_interval_in_sec
+        self.retry_interval_in_sec = retry_interval_in_sec
+        self.max_retries_at_close = max_retries_at_close
+        self.write_fn = write_fn
+        self.on_replayed = on_replayed
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='spill-replayer', daemon=True)
+
+    def start(self):
+        print(f'starting spill replayer, pending bytes: {self.spill_log.pending_bytes()}')
+        self._thread.start()
+        return self
+
+    # drains whatever is left, unless the DB stays unreachable for too long
+    def close(self, timeout: float = None):
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+        if self.spill_log.pending_bytes() == 0:
+            self.spill_log.clear()
+        else:
+            print(f'spill replayer closed with {self.spill_log.pending_bytes()} bytes not replayed, '
+                  f'they will be replayed on next start')
+
+    # returns the number of bytes of the spill log replayed
+    def replay_once(self) -> int:
+        offset = self.spill_log.read_offset()
+        rows, new_offset = self.spill_log.read(offset, self.max_batch_size)
+        if new_offset == offset:
+            return 0
+
+        prices = []
+        for row in rows:
+            price_model = self.price_models.get(row.instrument_token)
+            if price_model is None:
+                print(f'spill replayer: no price model for instrument {row.instrument_token}, skipping')
+                continue
+
+            prices.append(price_model(
+                timestamp=from_epoch_ms(row.epoch_ms),
+                tick_price=row.price,
+            ))
+
+        self.write_fn(prices)
+
+        # a crash right here replays this batch again, i.e. rows are written at least once
+        self.spill_log.commit_offset(new_offset)
+
+        if self.on_replayed is not None:
+            self.on_replayed(new_offset)
+
+        return new_offset - offset
+
+    def _run(self):
+        failed_attempts_at_close = 0
+
+        while True:
+            stopping = self._stop_event.is_set()
+
+            try:
+                replayed_byte_cnt = self.replay_once()
+            except Exception as e:
+                print(f'spill replayer: writing to DB failed, will retry: {e}')
+                traceback.print_exc()
+                connection.close()  # reconnect on next attempt
+
+                if stopping:
+                    failed_attempts_at_close += 1
+                    if failed_attempts_at_close >= self.max_retries_at_close:
+                        break
+
+                time.sleep(self.retry_interval_in_sec)
+                continue
+
+            if replayed_byte_cnt == 0:
+                if stopping:
+                    break
+
+                self._stop_event.wait(self.poll_interval_in_sec)
+
+        connection.close()
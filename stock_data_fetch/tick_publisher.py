@@ -0,0 +1,49 @@
+import json
+import urllib.request
+from typing import List
+from django.conf import settings
+from common.entities import TickRow
+from stock_data_fetch.bulk_writer import BulkWriter
+
+default_publish_url = getattr(settings, 'TICK_PUBLISH_URL', None)  # None disables publishing
+publish_timeout_in_sec = 2.0
+
+
+# Pushes the live ticks to the api server (price_app/handlers.py publish_ticks), which streams
+# them with their indicators to the charts subscribed. Best effort: a batch that can't be
+# delivered (api server down, ...) is dropped, the ticks still reach the DB by the spill log
+class TickPublisher:
+    def __init__(self, url: str = default_publish_url):
+        self.url = url
+        self.writer = BulkWriter('PUBLISH', self.publish, max_batch_size=200, max_wait_in_sec=0.1)
+        self.failures = 0
+
+    def start(self):
+        if self.url is not None:
+            self.writer.start()
+
+    def add_all(self, rows: List[TickRow]):
+        if self.url is not None:
+            self.writer.add_all(rows)
+
+    def close(self):
+        if self.url is not None:
+            self.writer.close()
+
+    def publish(self, rows: List[TickRow]):
+        body = json.dumps({'ticks': [[row.instrument_token, row.epoch_ms, row.price] for row in rows]}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+
+        try:
+            with urllib.request.urlopen(request, timeout=publish_timeout_in_sec) as response:
+                response.read()
+        except Exception as e:
+            # reported once per run of failures, not for every batch
+            if self.failures == 0:
+                print(f'[PUBLISH] publishing ticks to {self.url} failed, dropping them until it works again: {e}')
+            self.failures += 1
+            return
+
+        if self.failures > 0:
+            print(f'[PUBLISH] publishing ticks works again, {self.failures} batches dropped')
+            self.failures = 0
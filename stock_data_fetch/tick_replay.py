@@ -0,0 +1,290 @@
+import heapq
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+from django.apps import apps
+from django.db import transaction
+from common.constants import subscribed_instruments
+from common.entities import TickerData
+from stock_data_fetch.price_fetch import PriceFetchService
+from stock_data_fetch.spill_log import SpillLog
+from stock_data_fetch.tick_publisher import TickPublisher
+
+replay_sinks = ['null', 'rollback', 'db']
+
+
+# Stands in for KiteTicker: plays the given tick batches to the same on_connect / on_ticks /
+# on_close callbacks, from its own thread like KiteTicker does. Batches are paced by their
+# exchange timestamps, 'speed' times faster than real time, or as fast as possible for None
+class FakeTicker:
+    MODE_FULL = 'full'
+    MODE_QUOTE = 'quote'
+    MODE_LTP = 'ltp'
+
+    def __init__(self, tick_batches: Iterable[List[TickerData]], speed: Optional[float] = 1.0):
+        self.tick_batches = tick_batches
+        self.speed = speed
+
+        self.on_connect = None
+        self.on_ticks = None
+        self.on_close = None
+
+        self.subscribed_tokens: List[int] = []
+        self.tick_cnt = 0
+        self.batch_cnt = 0
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='fake-ticker', daemon=True)
+
+    def subscribe(self, instrument_tokens: List[int]):
+        self.subscribed_tokens.extend(instrument_tokens)
+
+    def set_mode(self, mode: str, instrument_tokens: List[int]):
+        pass
+
+    def connect(self, threaded: bool = False):
+        self._thread.start()
+        if not threaded:
+            self._thread.join()
+
+    def close(self, code=None, reason=None):
+        self._stop_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def join(self, timeout: float = None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        if self.on_connect is not None:
+            self.on_connect(self, {})
+
+        started_at = None
+        first_timestamp = None
+
+        for ticks in self.tick_batches:
+            if self._stop_event.is_set():
+                break
+
+            ticks = [tick for tick in ticks if tick['instrument_token'] in self.subscribed_tokens]
+            if len(ticks) == 0:
+                continue
+
+            if self.speed is not None:
+                timestamp = ticks[0]['exchange_timestamp']
+                if first_timestamp is None:
+                    started_at, first_timestamp = time.monotonic(), timestamp
+
+                due_at = started_at + (timestamp - first_timestamp).total_seconds() / self.speed
+                if self._stop_event.wait(max(due_at - time.monotonic(), 0)):
+                    break
+
+            self.on_ticks(self, ticks)
+            self.tick_cnt += len(ticks)
+            self.batch_cnt += 1
+
+        if self.on_close is not None:
+            self.on_close(self, 1000, 'replay finished')
+
+
+def new_tick(instrument_token: int, price: float, timestamp: datetime) -> TickerData:
+    return TickerData(
+        instrument_token=instrument_token,
+        last_price=price,
+        # kiteconnect gives naive local time
+        exchange_timestamp=timestamp.astimezone().replace(tzinfo=None),
+    )
+
+
+# stored ticks of all 'instruments' in [start_timestamp, end_timestamp], merged in time order and
+# grouped by second, the way the live feed delivers them
+def db_tick_batches(
+        start_timestamp: datetime,
+        end_timestamp: datetime,
+        instruments: Dict[int, str] = None,
+) -> Iterator[List[TickerData]]:
+    instruments = instruments if instruments is not None else subscribed_instruments
+
+    def ticks_of(instrument_token: int, model_label: str) -> Iterator[TickerData]:
+        prices = apps.get_model(model_label).objects.filter(
+            timestamp__gte=start_timestamp,
+            timestamp__lte=end_timestamp,
+        ).order_by('timestamp')
+
+        for price in prices.iterator():
+            yield new_tick(instrument_token, price.tick_price, price.timestamp)
+
+    ticks = heapq.merge(
+        *[ticks_of(instrument_token, model_label) for instrument_token, model_label in instruments.items()],
+        key=lambda tick: tick['exchange_timestamp'],
+    )
+
+    batch: List[TickerData] = []
+    for tick in ticks:
+        if len(batch) > 0 and \
+                tick['exchange_timestamp'].replace(microsecond=0) != batch[0]['exchange_timestamp'].replace(microsecond=0):
+            yield batch
+            batch = []
+
+        batch.append(tick)
+
+    if len(batch) > 0:
+        yield batch
+
+
+# one tick per instrument every 'interval_in_ms', prices following a gaussian random walk
+def random_walk_tick_batches(
+        tick_cnt: int,
+        start_timestamp: datetime,
+        instrument_tokens: List[int] = None,
+        interval_in_ms: int = 250,
+        start_price: float = 25000,
+        step_std_dev: float = 1.5,
+        seed: int = None,
+) -> Iterator[List[TickerData]]:
+    instrument_tokens = instrument_tokens if instrument_tokens is not None else list(subscribed_instruments.keys())
+    rand = random.Random(seed)
+    prices = {instrument_token: start_price for instrument_token in instrument_tokens}
+
+    i = 0
+    timestamp = start_timestamp
+    while i < tick_cnt:
+        batch: List[TickerData] = []
+        for instrument_token in instrument_tokens[:tick_cnt - i]:
+            prices[instrument_token] = round(prices[instrument_token] + rand.gauss(0, step_std_dev), 2)
+            batch.append(new_tick(instrument_token, prices[instrument_token], timestamp))
+
+        i += len(batch)
+        timestamp += timedelta(milliseconds=interval_in_ms)
+        yield batch
+
+
+def _rolled_back(write_fn: Callable[[List], None]) -> Callable[[List], None]:
+    def write(rows: List):
+        with transaction.atomic():
+            write_fn(rows)
+            transaction.set_rollback(True)
+
+    return write
+
+
+def _no_write(rows: List):
+    pass
+
+
+def percentiles_in_ms(latencies_in_sec: List[float]) -> str:
+    if len(latencies_in_sec) == 0:
+        return 'n/a'
+
+    p50, p90, p99, p_max = np.percentile(np.array(latencies_in_sec) * 1000, [50, 90, 99, 100])
+    return f'p50 {p50:.1f} ms, p90 {p90:.1f} ms, p99 {p99:.1f} ms, max {p_max:.1f} ms'
+
+
+# Latencies are measured per on_ticks() call, from the moment its ticks are queued
+class ReplayStats:
+    def __init__(self):
+        self.tick_cnt = 0
+        self.batch_cnt = 0
+        self.feed_time_in_sec = 0.0
+        self.total_time_in_sec = 0.0
+        self.spill_latencies: List[float] = []
+        self.db_latencies: List[float] = []
+        self.price_queue_depths: List[int] = []
+        self.pending_spill_bytes: List[int] = []
+
+        self._lock = threading.Lock()
+        self._not_replayed = []  # (spill log end offset, enqueued_ats) in offset order
+
+    # called in the price writer thread, right after a batch is in the spill log
+    def on_spilled(self, spill_log: SpillLog, enqueued_ats: List[float]):
+        now = time.monotonic()
+        self.spill_latencies.extend(now - enqueued_at for enqueued_at in enqueued_ats)
+
+        with self._lock:
+            self._not_replayed.append((spill_log.end_offset(), enqueued_ats))
+
+    # called in the spill replayer thread
+    def on_replayed(self, offset: int):
+        now = time.monotonic()
+
+        with self._lock:
+            while len(self._not_replayed) > 0 and self._not_replayed[0][0] <= offset:
+                _, enqueued_ats = self._not_replayed.pop(0)
+                self.db_latencies.extend(now - enqueued_at for enqueued_at in enqueued_ats)
+
+    def report(self) -> str:
+        return '\n'.join([
+            f'ticks replayed: {self.tick_cnt} in {self.batch_cnt} batches',
+            f'ticks/sec while feeding: {self.tick_cnt / max(self.feed_time_in_sec, 1e-9):.0f} '
+            f'({self.feed_time_in_sec:.2f} sec)',
+            f'ticks/sec end to end, till all written: {self.tick_cnt / max(self.total_time_in_sec, 1e-9):.0f} '
+            f'({self.total_time_in_sec:.2f} sec)',
+            f'tick -> spill log latency: {percentiles_in_ms(self.spill_latencies)}',
+            f'tick -> DB latency: {percentiles_in_ms(self.db_latencies)}',
+            f'price writer queue depth: max {max(self.price_queue_depths, default=0)}, '
+            f'mean {np.mean(self.price_queue_depths) if self.price_queue_depths else 0:.1f}',
+            f'spill log bytes not yet in DB: max {max(self.pending_spill_bytes, default=0)}',
+        ])
+
+
+# Runs the ingestion pipeline of PriceFetchService against a FakeTicker playing 'tick_batches'.
+# sink 'db' writes to the price / candle tables, 'rollback' does the same writes in transactions
+# that are rolled back and 'null' writes nothing to DB (only to a temporary spill log)
+def run_replay(
+        tick_batches: Iterable[List[TickerData]],
+        speed: Optional[float] = None,
+        sink: str = 'null',
+        sample_interval_in_sec: float = 0.05,
+) -> ReplayStats:
+    if sink not in replay_sinks:
+        raise Exception(f'invalid sink: {sink}, must be one of {replay_sinks}')
+
+    stats = ReplayStats()
+    ticker = FakeTicker(tick_batches, speed)
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        spill_log = SpillLog(Path(spill_dir) / 'ticks.log')
+        # replayed ticks are not pushed to the charts of a running api server
+        service = PriceFetchService(kws=ticker, spill_log=spill_log, tick_publisher=TickPublisher(url=None))
+
+        service.price_writer.on_flushed = lambda enqueued_ats: stats.on_spilled(spill_log, enqueued_ats)
+        service.spill_replayer.on_replayed = stats.on_replayed
+        if sink == 'null':
+            service.spill_replayer.write_fn = _no_write
+            service.candle_writer.flush_fn = _no_write
+        elif sink == 'rollback':
+            service.spill_replayer.write_fn = _rolled_back(service.spill_replayer.write_fn)
+            service.candle_writer.flush_fn = _rolled_back(service.candle_writer.flush_fn)
+
+        sampling_done = threading.Event()
+
+        def sample_queue_depths():
+            while not sampling_done.wait(sample_interval_in_sec):
+                stats.price_queue_depths.append(service.price_writer.queue_depth)
+                stats.pending_spill_bytes.append(spill_log.pending_bytes())
+
+        sampler = threading.Thread(target=sample_queue_depths, name='replay-sampler', daemon=True)
+
+        started_at = time.monotonic()
+        sampler.start()
+        service.start()
+
+        ticker.join()
+        stats.feed_time_in_sec = time.monotonic() - started_at
+
+        service.stop()
+        stats.total_time_in_sec = time.monotonic() - started_at
+
+        sampling_done.set()
+        sampler.join()
+
+    stats.tick_cnt = ticker.tick_cnt
+    stats.batch_cnt = ticker.batch_cnt
+
+    return stats